@@ -0,0 +1,578 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import REGISTRY
+from scheduler import APPSTORE_CONNECT, get_scheduler
+
+APPSTORE_API_URL = "https://api.appstoreconnect.apple.com/v1"
+DEFAULT_POOL_SIZE = 10
+LOCALIZATION_FIELDS = "locale,whatsNew,description,keywords,promotionalText"
+# maximum number of related localizations included per version
+INCLUDED_LOCALIZATIONS_LIMIT = 50
+
+_client = None
+_client_options = {}
+_client_lock = threading.Lock()
+
+
+class PageError(Exception):
+    """A page after the first one of a paginated response could not be fetched"""
+
+    def __init__(self, status_code, url):
+        super().__init__(f"HTTP {status_code} for {url}")
+        self.status_code = status_code
+        self.url = url
+
+
+class AppStoreConnectClient:
+    """HTTP client for the AppStoreConnect API
+
+    All requests share one pooled, keep-alive `requests.Session`, so connections to the API are reused instead of
+    paying a new TCP and TLS handshake for every call.
+    """
+
+    def __init__(self, token=None, pool_size=DEFAULT_POOL_SIZE):
+        # imported on first use, so runs that never reach the API do not pay for importing requests
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        self.token = token
+
+    def request(self, method, url, token=None, **kwargs):
+        """Send a request through the shared request scheduler, which applies rate limits and retries
+
+        Args:
+        method (str): HTTP method
+        url (str): Url
+        token (str or TokenProvider): AppStoreConnect API token, defaults to the token of the client
+
+        Returns:
+        requests.Response or httpx.Response: Response
+        """
+        token = token if token is not None else self.token
+
+        extra_headers = kwargs.pop("headers", None) or {}
+
+        def send():
+            headers = build_headers(token) if token is not None else {}
+            headers.update(extra_headers)
+            return self._send(method, url, headers, **kwargs)
+
+        return get_scheduler().call(APPSTORE_CONNECT, send)
+
+    def _send(self, method, url, headers, **kwargs):
+        return self.session.request(method, url, headers=headers, **kwargs)
+
+    def get(self, url, token=None, **kwargs):
+        """Send a GET request, see request"""
+        return self.request("GET", url, token, **kwargs)
+
+    def patch(self, url, token=None, **kwargs):
+        """Send a PATCH request, see request"""
+        return self.request("PATCH", url, token, **kwargs)
+
+    def connection_stats(self):
+        """Get connection reuse statistics of the pool
+
+        Returns:
+        dict: Number of requests, opened connections and requests served by reused connections
+        """
+        pools = self.adapter.poolmanager.pools
+        stats = {"requests": 0, "connections": 0}
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                stats["requests"] += pool.num_requests
+                stats["connections"] += pool.num_connections
+        stats["reused"] = stats["requests"] - stats["connections"]
+        return stats
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+class AppStoreConnectHttp2Client(AppStoreConnectClient):
+    """HTTP/2 client for the AppStoreConnect API, based on httpx
+
+    Concurrent requests are multiplexed as streams over a few connections instead of needing one connection per
+    request in flight. httpx and h2 are optional dependencies, imported when the client is created. Servers without
+    HTTP/2 support, including plain http urls, are talked to with HTTP/1.1.
+    """
+
+    def __init__(self, token=None, pool_size=DEFAULT_POOL_SIZE):
+        import httpx
+
+        self.pool_size = pool_size
+        self.session = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            headers={"Content-Type": "application/json"}
+        )
+        self.token = token
+        self._stats = {"requests": 0, "connections": 0, "http2": 0}
+        self._stats_lock = threading.Lock()
+
+    def _send(self, method, url, headers, **kwargs):
+        response = self.session.request(method, url, headers=headers, extensions={"trace": self._trace}, **kwargs)
+        with self._stats_lock:
+            self._stats["requests"] += 1
+            if response.http_version == "HTTP/2":
+                self._stats["http2"] += 1
+        return response
+
+    def _trace(self, event_name, info):
+        if event_name == "connection.connect_tcp.complete":
+            with self._stats_lock:
+                self._stats["connections"] += 1
+
+    def connection_stats(self):
+        """Get connection reuse statistics of the pool
+
+        Returns:
+        dict: Number of requests, opened connections, requests served by reused connections and HTTP/2 requests
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["reused"] = stats["requests"] - stats["connections"]
+        return stats
+
+
+def get_client():
+    """Get the shared AppStoreConnect client, creating it on first use
+
+    Returns:
+    AppStoreConnectClient: Shared client
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            options = dict(_client_options)
+            client_class = AppStoreConnectHttp2Client if options.pop("http2", False) else AppStoreConnectClient
+            _client = client_class(**options)
+        return _client
+
+
+def configure_client(token=None, pool_size=DEFAULT_POOL_SIZE, http2=False):
+    """Configure the shared AppStoreConnect client, e.g. to match the pool size to the number of workers
+
+    The client is created by get_client on first use.
+
+    Args:
+    token (str or TokenProvider): Default AppStoreConnect API token
+    pool_size (int): Maximum number of pooled connections
+    http2 (bool): Use the HTTP/2 client AppStoreConnectHttp2Client
+    """
+    global _client, _client_options
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _client_options = {"token": token, "pool_size": pool_size, "http2": http2}
+
+
+def find_app_id(token, bundle_id, cache=None):
+    """Find the app id of a bundle id
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    bundle_id (str): Bundle id, e.g. "com.example.app"
+    cache (MetadataCache): Optional metadata cache
+
+    Returns:
+    str: App ID or None if no app was found
+    """
+    if cache is not None:
+        apps = cache.fetch(f"apps/{bundle_id}", lambda etag: fetch_pages(token, apps_url(bundle_id), parse_apps, etag))
+    else:
+        with REGISTRY.time("stage_duration_seconds", stage="fetch"):
+            response = get_client().get(apps_url(bundle_id), token)
+        apps = parse_apps(json.loads(response.text)) if response.status_code == 200 else []
+
+    for app in apps:
+        if app["bundleId"] == bundle_id:
+            return app["id"]
+
+    return None
+
+
+def list_apps(token, cache=None):
+    """Get all apps of the team
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    cache (MetadataCache): Optional metadata cache
+
+    Returns:
+    list: List of apps with id, name and bundle id
+    """
+    if cache is not None:
+        return cache.fetch("apps", lambda etag: fetch_pages(token, apps_list_url(), parse_apps, etag))
+    return list(iter_pages(token, apps_list_url(), parse_apps))
+
+
+def get_prerelease_versions(token, appid, cache=None):
+    """Get all prerelease versions
+
+    The localizations of the versions are included in the same response, see parse_prerelease_versions.
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    appid (str): App ID
+    cache (MetadataCache): Optional metadata cache
+
+    Returns:
+    list: List of prerelease versions
+    """
+    if cache is not None:
+        return cache.fetch(f"versions/{appid}", lambda etag: fetch_pages(
+            token, prerelease_versions_url(appid), parse_prerelease_versions, etag
+        ), compact=compact_versions)
+    return list(iter_prerelease_versions(token, appid))
+
+
+def iter_prerelease_versions(token, appid):
+    """Iterate over all prerelease versions, following the pagination links
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    appid (str): App ID
+
+    Yields:
+    dict: Prerelease version
+    """
+    return iter_pages(token, prerelease_versions_url(appid), parse_prerelease_versions)
+
+
+def get_all_localization_ids(token, version_id):
+    """Get all localization ids for a given version
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    version_id (str): AppStoreConnect version id
+
+    Returns:
+    list: List of localizations with id, locale and the current text of every field
+    """
+    return list(iter_localizations(token, version_id))
+
+
+def get_version_localizations(token, version):
+    """Get the localizations of a version, using the ones included in the version listing if complete
+
+    Localizations are never served from the metadata cache, their current texts are needed to skip unchanged ones.
+    Versions from the cache come without them, so their localizations are fetched with one listing.
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    version (dict): Prerelease version
+
+    Returns:
+    list: List of localizations with id, locale and the current text of every field
+    """
+    if version.get("localizations") is not None:
+        return version["localizations"]
+    return get_all_localization_ids(token, version["id"])
+
+
+def iter_localizations(token, version_id):
+    """Iterate over all localizations of a given version, following the pagination links
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    version_id (str): AppStoreConnect version id
+
+    Yields:
+    dict: Localization with id, locale and the current text of every field
+    """
+    return iter_pages(token, localizations_url(version_id), parse_localizations)
+
+
+def iter_pages(token, url, parse, first_page=None):
+    """Iterate over the items of a paginated response
+
+    Items are yielded as soon as their page arrived, while the next page (`links.next`) is already being fetched in
+    the background. An unsuccessful first page yields no items, an unsuccessful later page raises PageError, so a
+    truncated list is never taken for a complete one.
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    url (str): Url of the first page
+    parse (function): Function parsing the items of a page
+    first_page (dict): Already fetched first page, e.g. by fetch_pages
+
+    Yields:
+    dict: Parsed item
+    """
+    def fetch(page_url):
+        with REGISTRY.time("stage_duration_seconds", stage="fetch"):
+            response = get_client().get(page_url, token)
+        if response.status_code != 200:
+            return response.status_code, None
+        return response.status_code, json.loads(response.text)
+
+    data = first_page
+    if data is None:
+        _, data = fetch(url)
+        if data is None:
+            return
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        while True:
+            next_url = data.get("links", {}).get("next")
+            page = executor.submit(fetch, next_url) if next_url else None
+            yield from parse(data)
+            if page is None:
+                return
+            status_code, data = page.result()
+            if data is None:
+                raise PageError(status_code, next_url)
+
+
+def fetch_pages(token, url, parse, etag=None):
+    """Fetch all items of a paginated response, revalidating the first page with If-None-Match
+
+    A failed later page raises PageError like in iter_pages, so a metadata cache never stores a truncated list.
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    url (str): Url of the first page
+    parse (function): Function parsing the items of a page
+    etag (str): ETag of a previously fetched response
+
+    Returns:
+    int, list, str: Status code, items (None unless the status code is 200) and ETag of a single page response
+    """
+    headers = {"If-None-Match": etag} if etag is not None else {}
+    with REGISTRY.time("stage_duration_seconds", stage="fetch"):
+        response = get_client().get(url, token, headers=headers)
+    if response.status_code != 200:
+        return response.status_code, None, None
+
+    data = json.loads(response.text)
+    if not data.get("links", {}).get("next"):
+        return 200, parse(data), response.headers.get("ETag")
+
+    return 200, list(iter_pages(token, url, parse, first_page=data)), None
+
+
+def update_localization(token, app_version_localization_id, attributes):
+    """Update attributes of a given localization
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    app_version_localization_id (str): AppStoreConnect localization id
+    attributes (dict): Localization attributes, e.g. {"whatsNew": "..."}
+
+    Returns:
+    int: HTTP status code
+    """
+    with REGISTRY.time("stage_duration_seconds", stage="patch"):
+        response = get_client().patch(
+            localization_url(app_version_localization_id),
+            token,
+            json=build_localization_payload(app_version_localization_id, attributes)
+        )
+    return response.status_code
+
+
+def apps_list_url():
+    """Build the url listing all apps
+
+    Returns:
+    str: Url
+    """
+    return f"{APPSTORE_API_URL}/apps?limit=200&fields[apps]=name,bundleId"
+
+
+def apps_url(bundle_id):
+    """Build the url looking up an app by its bundle id
+
+    Args:
+    bundle_id (str): Bundle id
+
+    Returns:
+    str: Url
+    """
+    return f"{APPSTORE_API_URL}/apps?filter[bundleId]={bundle_id}&fields[apps]=bundleId,name"
+
+
+def prerelease_versions_url(appid):
+    """Build the url listing all prerelease versions of an app
+
+    Args:
+    appid (str): App ID
+
+    Returns:
+    str: Url
+    """
+    return (
+        f"{APPSTORE_API_URL}/apps/{appid}/appStoreVersions?limit=200&filter[appStoreState]=PREPARE_FOR_SUBMISSION"
+        f"&include=appStoreVersionLocalizations&limit[appStoreVersionLocalizations]={INCLUDED_LOCALIZATIONS_LIMIT}"
+        f"&fields[appStoreVersions]=platform,versionString,appStoreVersionLocalizations"
+        f"&fields[appStoreVersionLocalizations]={LOCALIZATION_FIELDS}"
+    )
+
+
+def localizations_url(version_id):
+    """Build the url listing all localizations of a version
+
+    Args:
+    version_id (str): AppStoreConnect version id
+
+    Returns:
+    str: Url
+    """
+    return (
+        f"{APPSTORE_API_URL}/appStoreVersions/{version_id}/appStoreVersionLocalizations?limit=200"
+        f"&fields[appStoreVersionLocalizations]={LOCALIZATION_FIELDS}"
+    )
+
+
+def localization_url(app_version_localization_id):
+    """Build the url of a localization
+
+    Args:
+    app_version_localization_id (str): AppStoreConnect localization id
+
+    Returns:
+    str: Url
+    """
+    return f"{APPSTORE_API_URL}/appStoreVersionLocalizations/{app_version_localization_id}"
+
+
+def build_headers(token):
+    """Build the request headers
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token or a provider returning it
+
+    Returns:
+    dict: Request headers
+    """
+    if callable(token):
+        token = token()
+    return {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json"
+    }
+
+
+def build_localization_payload(app_version_localization_id, attributes):
+    """Build the PATCH payload of a localization
+
+    Args:
+    app_version_localization_id (str): AppStoreConnect localization id
+    attributes (dict): Localization attributes
+
+    Returns:
+    dict: Request payload
+    """
+    return {
+        "data": {
+            "attributes": attributes,
+            "id": app_version_localization_id,
+            "type": "appStoreVersionLocalizations"
+        }
+    }
+
+
+def parse_apps(data):
+    """Parse apps from an apps response
+
+    Args:
+    data (dict): Response body
+
+    Returns:
+    list: List of apps
+    """
+    apps = []
+    for app in data["data"]:
+        if app["type"] == "apps":
+            apps.append({
+                "id": app["id"],
+                "name": app["attributes"]["name"],
+                "bundleId": app["attributes"]["bundleId"],
+            })
+
+    return apps
+
+
+def parse_prerelease_versions(data):
+    """Parse versions from an appStoreVersions response
+
+    Localizations included in the compound response are resolved into the "localizations" of their version. It is
+    None if they were not included or truncated by the include limit, see get_version_localizations.
+
+    Args:
+    data (dict): Response body
+
+    Returns:
+    list: List of versions
+    """
+    included = {localization["id"]: localization for localization in parse_localizations({
+        "data": data.get("included", [])
+    })}
+
+    versions = []
+    for version in data["data"]:
+        if version["type"] == "appStoreVersions":
+            relationship = version.get("relationships", {}).get("appStoreVersionLocalizations", {})
+            ids = [item["id"] for item in relationship.get("data") or []]
+            total = relationship.get("meta", {}).get("paging", {}).get("total", len(ids))
+            complete = "data" in relationship and total <= len(ids) and all(i in included for i in ids)
+            versions.append({
+                "id": version["id"],
+                "platform": version["attributes"]["platform"],
+                "versionString": version["attributes"]["versionString"],
+                "localizations": [included[i] for i in ids] if complete else None,
+            })
+
+    return versions
+
+
+def compact_versions(versions):
+    """Drop the included localizations of versions before caching them
+
+    The current texts of the localizations must not be served from the cache, since unchanged texts are skipped by
+    comparing them with the translations. get_version_localizations fetches the localizations of the selected version
+    instead.
+
+    Args:
+    versions (list): Versions returned by parse_prerelease_versions
+
+    Returns:
+    list: Versions to cache
+    """
+    return [dict(version, localizations=None) for version in versions]
+
+
+def parse_localizations(data):
+    """Parse localizations from an appStoreVersionLocalizations response
+
+    Args:
+    data (dict): Response body
+
+    Returns:
+    list: List of localizations with id, locale and the current text of every field
+    """
+    localizations = []
+    for localization in data["data"]:
+        if localization["type"] == "appStoreVersionLocalizations":
+            localizations.append({
+                "id": localization["id"],
+                "locale": localization["attributes"]["locale"],
+                "whatsNew": localization["attributes"].get("whatsNew"),
+                "description": localization["attributes"].get("description"),
+                "keywords": localization["attributes"].get("keywords"),
+                "promotionalText": localization["attributes"].get("promotionalText")
+            })
+
+    return localizations
@@ -0,0 +1,89 @@
+import threading
+import time
+
+# AppStoreConnect rejects tokens that are valid for more than 20 minutes
+TOKEN_LIFETIME = 20 * 60
+REFRESH_MARGIN = 2 * 60
+
+
+class TokenProvider:
+    """Cached AppStoreConnect API token (JWT)
+
+    The signed token is reused until shortly before it expires. Within `refresh_margin` seconds of expiry a single
+    caller signs a new token while concurrent callers keep using the still valid one, so workers neither block on
+    signing nor send expired tokens during long runs. Calling the provider returns the current token.
+    """
+
+    def __init__(self, key_id, key_file_path, issuer_id, lifetime=TOKEN_LIFETIME, refresh_margin=REFRESH_MARGIN):
+        self.key_id = key_id
+        self.issuer_id = issuer_id
+        self.lifetime = lifetime
+        self.refresh_margin = refresh_margin
+        try:
+            with open(key_file_path, 'r') as f:
+                self._key = f.read()
+        except IOError:
+            # like appstoreconnect.Api, accept the key itself instead of a path
+            self._key = key_file_path
+        self._token = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        return self.get()
+
+    def get(self):
+        """Get a valid token, signing a new one if the cached token is about to expire
+
+        Returns:
+        str: AppStoreConnect API token
+        """
+        token, expires_at = self._token, self._expires_at
+        now = time.time()
+        if token is not None and now < expires_at - self.refresh_margin:
+            return token
+
+        if token is not None and now < expires_at - 1:
+            # still valid: refresh in the calling thread only if no other thread is already doing so
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._refresh_if_needed()
+                finally:
+                    self._lock.release()
+            return self._token
+
+        with self._lock:
+            self._refresh_if_needed()
+            return self._token
+
+    def _refresh_if_needed(self):
+        if self._token is not None and time.time() < self._expires_at - self.refresh_margin:
+            return
+
+        # imported on first use, PyJWT pulls in cryptography which is slow to import
+        import jwt
+
+        now = int(time.time())
+        expires_at = now + self.lifetime
+        token = jwt.encode(
+            {'iss': self.issuer_id, 'iat': now, 'exp': expires_at, 'aud': 'appstoreconnect-v1'},
+            self._key,
+            headers={'kid': self.key_id, 'typ': 'JWT'},
+            algorithm='ES256'
+        )
+        # PyJWT < 2 returns bytes
+        if isinstance(token, bytes):
+            token = token.decode('ascii')
+        self._token, self._expires_at = token, expires_at
+
+
+def setup_token_provider(settings):
+    """Setup the token provider from the [AppStoreConnect] section of config.ini
+
+    Args:
+    settings (Settings or Profile): Settings or the credentials of a profile
+
+    Returns:
+    TokenProvider: Token provider
+    """
+    return TokenProvider(settings.key_id, settings.key_file_path, settings.issuer_id)
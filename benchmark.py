@@ -0,0 +1,179 @@
+import argparse
+import configparser
+import json
+import math
+import os
+import tempfile
+import time
+
+import deepl
+
+import appstore
+import mock_servers
+from fields import CHANGELOG
+from fleet import run_manifest
+from metrics import REGISTRY
+from scheduler import APPSTORE_CONNECT, DEEPL, RequestScheduler, TokenBucket, configure_scheduler
+
+# scenarios as number of apps and number of localizations per app
+SCENARIOS = {
+    "1x40": (1, 40),
+    "50x40": (50, 40),
+}
+CHANGELOG_TEXT = "Improvements and minor bug fixes"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark against local AppStoreConnect and Deepl stand-ins')
+    parser.add_argument('-s', '--scenario', type=str, action='append', choices=list(SCENARIOS),
+                        help='Scenario to run, can be repeated, defaults to all scenarios', required=False)
+    parser.add_argument('-n', '--repeat', type=int, help='Runs per scenario', required=False, default=3)
+    parser.add_argument('-w', '--workers', type=int, help='Number of parallel workers', required=False, default=8)
+    parser.add_argument('--latency', type=float, help='Latency of the stand-in servers in milliseconds',
+                        required=False, default=50)
+    parser.add_argument('--error-rate', type=float, help='Share of requests failing with HTTP 500', required=False,
+                        default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, help='Share of requests failing with HTTP 429',
+                        required=False, default=0.0)
+    parser.add_argument('--retry-after', type=int, help='Retry-After of HTTP 429 responses in seconds',
+                        required=False, default=1)
+    parser.add_argument('--rate-limits', action='store_true', help='Apply the default client side rate limits')
+    parser.add_argument('--http2', action='store_true', help='Send AppStoreConnect requests with the HTTP/2 client. '
+                                                             'The stand-in speaks HTTP/1.1 only, so this measures '
+                                                             'the overhead of the client, not multiplexing')
+    parser.add_argument('-o', '--output', type=str, help='Path of a JSON file with the results', required=False)
+    args = parser.parse_args()
+
+    server_options = {
+        "latency": args.latency / 1000,
+        "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate,
+        "retry_after": args.retry_after
+    }
+    app_store_connect_server = mock_servers.start_app_store_connect_server(**server_options)
+    deepl_server = mock_servers.start_deepl_server(**server_options)
+    appstore.APPSTORE_API_URL = f"{app_store_connect_server.url}/v1"
+    translator = deepl.Translator("benchmark:fx", server_url=deepl_server.url)
+
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            changelog_path = os.path.join(directory, "changelog.txt")
+            with open(changelog_path, 'w') as f:
+                f.write(CHANGELOG_TEXT)
+            config = configparser.ConfigParser()
+            config.read_dict({"Changelog": {"changelog_path": changelog_path, "changelog_language": "EN"}})
+
+            for scenario in args.scenario or list(SCENARIOS):
+                app_store_connect_server.locales = SCENARIOS[scenario][1]
+                results.append(run_scenario(scenario, translator, config, args))
+                print_result(results[-1])
+    finally:
+        app_store_connect_server.stop()
+        deepl_server.stop()
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+def run_scenario(scenario, translator, config, args):
+    """Run a scenario several times
+
+    Args:
+    scenario (str): Name of the scenario
+    translator (deepl.Translator): Deepl translator using the stand-in server
+    config (configparser.ConfigParser): Config with the changelog
+    args (argparse.Namespace): Command line arguments
+
+    Returns:
+    dict: Result of the scenario
+    """
+    apps, _ = SCENARIOS[scenario]
+    manifest = [{"app": str(1000000 + i)} for i in range(apps)]
+
+    durations = []
+    totals = {"updated": 0, "failed": 0, "failed_apps": 0}
+    connections = {"requests": 0, "connections": 0, "http2": 0}
+    REGISTRY.reset()
+    for _ in range(args.repeat):
+        if args.rate_limits:
+            configure_scheduler(RequestScheduler())
+        else:
+            configure_scheduler(RequestScheduler(buckets={
+                APPSTORE_CONNECT: TokenBucket(rate=1e9, capacity=1e9),
+                DEEPL: TokenBucket(rate=1e9, capacity=1e9),
+            }))
+        appstore.configure_client("benchmark", pool_size=max(1, args.workers), http2=args.http2)
+
+        start = time.perf_counter()
+        report = run_manifest(translator, "benchmark", manifest, [CHANGELOG], config, workers=args.workers)
+        durations.append(time.perf_counter() - start)
+        for key in totals:
+            totals[key] += report["totals"][key]
+        stats = appstore.get_client().connection_stats()
+        for key in connections:
+            connections[key] += stats.get(key, 0)
+
+    result = {
+        "scenario": scenario,
+        "runs": args.repeat,
+        "workers": args.workers,
+        "transport": "http2" if args.http2 else "http1.1",
+        "runs_per_second": args.repeat / sum(durations),
+        "run_p50": percentile(durations, 0.5),
+        "run_p99": percentile(durations, 0.99),
+        "totals": totals,
+        "connections": connections,
+        "note": ("the HTTP/2 client falls back to HTTP/1.1 with the stand-in, only its overhead is measured, not "
+                 "multiplexing") if args.http2 and connections["http2"] == 0 else None,
+        "requests": {}
+    }
+    for upstream in (APPSTORE_CONNECT, DEEPL):
+        histogram = REGISTRY.histogram("http_request_duration_seconds", upstream=upstream)
+        if histogram is not None:
+            result["requests"][upstream] = {
+                "count": histogram.count,
+                "p50": histogram.quantile(0.5),
+                "p99": histogram.quantile(0.99)
+            }
+
+    return result
+
+
+def percentile(values, q):
+    """Get a percentile of values using the nearest rank
+
+    Args:
+    values (list): Values
+    q (float): Quantile between 0 and 1
+
+    Returns:
+    float: Percentile
+    """
+    values = sorted(values)
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+def print_result(result):
+    """Print the result of a scenario
+
+    Args:
+    result (dict): Result returned by run_scenario
+    """
+    print(f"=== {result['scenario']} ({result['runs']} runs, {result['workers']} workers, {result['transport']}) ===")
+    print(f"Runs/sec: {result['runs_per_second']:.3f}")
+    print(f"Run latency p50: {result['run_p50'] * 1000:.0f} ms, p99: {result['run_p99'] * 1000:.0f} ms")
+    for upstream, requests in result["requests"].items():
+        print(f"{upstream} requests: {requests['count']}, latency p50: {requests['p50'] * 1000:.0f} ms, "
+              f"p99: {requests['p99'] * 1000:.0f} ms")
+    print(f"AppStoreConnect connections: {result['connections']['connections']} opened for "
+          f"{result['connections']['requests']} requests, {result['connections']['http2']} sent with HTTP/2")
+    if result["note"] is not None:
+        print(f"Note: {result['note']}")
+    print(f"Localizations updated: {result['totals']['updated']}, failed: {result['totals']['failed']}, "
+          f"failed apps: {result['totals']['failed_apps']}")
+
+
+if __name__ == '__main__':
+    main()
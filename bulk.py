@@ -0,0 +1,229 @@
+import argparse
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from appstore import (apps_list_url, configure_client, find_app_id, get_version_localizations, iter_pages,
+                      iter_prerelease_versions, parse_apps, update_localization)
+from appstore_token import setup_token_provider
+from fields import FIELDS
+from metrics import write_metrics
+from settings import load_settings
+from update_localizations import validate_config
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_CONCURRENCY = 50
+
+
+def main():
+    """Export all localized texts to JSONL or import an edited export"""
+    parser = argparse.ArgumentParser(description='Bulk export and import of localized texts as JSONL')
+    parser.add_argument('-c', '--config', type=str, help='Path to config.ini', required=False, default='config.ini')
+    parser.add_argument('--metrics-out', type=str, help='Path of a metrics file written after the run, Prometheus '
+                                                        'textfile format for .prom, JSON otherwise', required=False)
+    parser.add_argument('--http2', action='store_true', help='Send AppStoreConnect requests with the HTTP/2 client')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Export the texts of all prerelease versions')
+    export_parser.add_argument('-o', '--output', type=str, help='Path of the JSONL file', required=False,
+                               default='texts.jsonl')
+    export_parser.add_argument('-a', '--apps', type=str, help='Comma separated bundle ids or app ids, all apps if '
+                                                              'not given', required=False)
+    export_parser.add_argument('-f', '--fields', type=str, required=False, default=",".join(FIELDS),
+                               help=f"Comma separated fields to export: {', '.join(FIELDS)}")
+
+    import_parser = subparsers.add_parser('import', help='Update localizations from an exported JSONL file')
+    import_parser.add_argument('-i', '--input', type=str, help='Path of the JSONL file', required=False,
+                               default='texts.jsonl')
+    import_parser.add_argument('-b', '--batch-size', type=int, help='Number of localizations updated per batch',
+                               required=False, default=DEFAULT_BATCH_SIZE)
+    import_parser.add_argument('-n', '--concurrency', type=int, help='Number of PATCH requests in flight',
+                               required=False, default=DEFAULT_CONCURRENCY)
+    import_parser.add_argument('--force', action='store_true', help='Also update texts that were not edited since '
+                                                                     'the export')
+    args = parser.parse_args()
+
+    settings = load_settings(args.config)
+    if not validate_config(settings, []):
+        return
+
+    token_provider = setup_token_provider(settings)
+    pool_size = args.concurrency if args.command == 'import' else 1
+    configure_client(token_provider, pool_size=max(1, pool_size), http2=args.http2)
+
+    if args.command == 'export':
+        field_names = [name.strip() for name in args.fields.split(',') if name.strip()]
+        unknown_fields = [name for name in field_names if name not in FIELDS]
+        if unknown_fields:
+            print(f"Unknown field(s): {', '.join(unknown_fields)}")
+            return
+        apps = [app.strip() for app in args.apps.split(',') if app.strip()] if args.apps else None
+        with open(args.output, 'w', encoding='utf-8') as f:
+            count = export_texts(token_provider, f, apps, [FIELDS[name] for name in field_names])
+        print(f"Exported {count} texts to {args.output}")
+    else:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            summary = import_texts(token_provider, f, args.batch_size, args.concurrency, args.force)
+        print(f"Imported {args.input}: {summary}")
+
+    if args.metrics_out is not None:
+        write_metrics(args.metrics_out)
+
+
+def export_texts(token, output, apps, fields):
+    """Stream the texts of every app, prerelease version, locale and field to a JSONL file
+
+    Apps, versions and localizations are fetched page by page and written immediately, so memory use does not grow
+    with the number of apps.
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    output (file): JSONL file opened for writing
+    apps (list): Bundle ids or app ids, all apps if None
+    fields (list): Fields to export
+
+    Returns:
+    int: Number of exported texts
+    """
+    count = 0
+    for app in iter_apps(token, apps):
+        for version in iter_prerelease_versions(token, app["id"]):
+            for localization in get_version_localizations(token, version):
+                for field in fields:
+                    text = localization.get(field.attribute)
+                    output.write(json.dumps({
+                        "app_id": app["id"],
+                        "bundle_id": app["bundleId"],
+                        "version_id": version["id"],
+                        "version": version["versionString"],
+                        "platform": version["platform"],
+                        "localization_id": localization["id"],
+                        "locale": localization["locale"],
+                        "field": field.name,
+                        "text": text,
+                        "hash": text_hash(text),
+                    }, ensure_ascii=False) + "\n")
+                    count += 1
+
+    return count
+
+
+def iter_apps(token, apps=None):
+    """Iterate over the apps to export
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    apps (list): Bundle ids or app ids, all apps if None
+
+    Yields:
+    dict: App with id and bundle id
+    """
+    if apps is None:
+        yield from iter_pages(token, apps_list_url(), parse_apps)
+        return
+
+    for app in apps:
+        if app.isdigit():
+            yield {"id": app, "bundleId": None}
+            continue
+        app_id = find_app_id(token, app)
+        if app_id is None:
+            print(f"App {app} not found")
+            continue
+        yield {"id": app_id, "bundleId": app}
+
+
+def import_texts(token, lines, batch_size=DEFAULT_BATCH_SIZE, concurrency=DEFAULT_CONCURRENCY, force=False):
+    """Update localizations from the lines of an export
+
+    The lines are read one by one. The edited fields of a localization are merged into one PATCH, and up to
+    `batch_size` localizations are patched by `concurrency` threads on the shared client before the next lines are
+    read, so memory use is bounded by the batch size. Texts whose hash still matches the export are skipped unless
+    `force` is set, texts violating the constraints of their field are reported as invalid lines without sending them.
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    lines (iterable): Lines of a JSONL file created by export_texts
+    batch_size (int): Number of localizations per batch
+    concurrency (int): Maximum number of PATCH requests in flight
+    force (bool): Update unedited texts too
+
+    Returns:
+    dict: Number of updated and failed localizations, of skipped unedited texts and of invalid lines
+    """
+    summary = {"updated": 0, "skipped": 0, "failed": 0, "invalid": 0}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        batch = {}
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                field = FIELDS[record["field"]]
+                localization_id = record["localization_id"]
+                text = record["text"]
+            except (ValueError, KeyError) as e:
+                print(f"Line {line_number} is invalid: {e!r}")
+                summary["invalid"] += 1
+                continue
+
+            if not force and record.get("hash") == text_hash(text):
+                summary["skipped"] += 1
+                continue
+            error = field.validate(text) if text is not None else None
+            if error is not None:
+                print(f"Line {line_number} is invalid: {error}")
+                summary["invalid"] += 1
+                continue
+
+            batch.setdefault(localization_id, {"locale": record.get("locale"), "attributes": {}})
+            batch[localization_id]["attributes"][field.attribute] = text
+            if len(batch) >= batch_size:
+                apply_batch(token, batch, executor, summary)
+                batch = {}
+
+        if batch:
+            apply_batch(token, batch, executor, summary)
+    return summary
+
+
+def apply_batch(token, batch, executor, summary):
+    """Patch a batch of localizations concurrently and count the results
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    batch (dict): Locale and attributes by localization id
+    executor (concurrent.futures.Executor): Executor sending the PATCH requests
+    summary (dict): Summary updated with the results
+    """
+    futures = {
+        localization_id: executor.submit(update_localization, token, localization_id, update["attributes"])
+        for localization_id, update in batch.items()
+    }
+    for localization_id, future in futures.items():
+        try:
+            status_code = future.result()
+            error = None if status_code == 200 else f"HTTP {status_code}"
+        except Exception as e:
+            error = repr(e)
+        if error is None:
+            summary["updated"] += 1
+        else:
+            print(f"Failed to update {batch[localization_id]['locale']} ({localization_id}): {error}")
+            summary["failed"] += 1
+
+
+def text_hash(text):
+    """Hash an exported text, so unedited texts can be skipped on import
+
+    Args:
+    text (str): Text, None if the field is empty
+
+    Returns:
+    str: Hash
+    """
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+if __name__ == '__main__':
+    main()
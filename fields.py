@@ -0,0 +1,118 @@
+import re
+
+from appstore import update_localization
+
+# control characters rejected by AppStoreConnect, tabs and line breaks are allowed
+CONTROL_CHARACTERS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+
+
+class Field:
+    """Localization field translated from a source text
+
+    The source text path and language are read from the config.ini section of the field, using the keys
+    `<name>_path` and `<name>_language`.
+    """
+
+    def __init__(self, name, attribute, section, title, max_length=None):
+        self.name = name
+        self.attribute = attribute
+        self.section = section
+        self.title = title
+        self.max_length = max_length
+        self.path_key = f"{name}_path"
+        self.language_key = f"{name}_language"
+
+    def source_path(self, config, overrides=None):
+        """Get the path of the source text
+
+        Args:
+        config (configparser.ConfigParser): Parsed config.ini
+        overrides (dict): Optional values overriding config.ini, e.g. a manifest entry
+
+        Returns:
+        str: Path of the source text
+        """
+        if overrides is not None and self.path_key in overrides:
+            return overrides[self.path_key]
+        return config[self.section][self.path_key]
+
+    def source_language(self, config, overrides=None):
+        """Get the language of the source text
+
+        Args:
+        config (configparser.ConfigParser): Parsed config.ini
+        overrides (dict): Optional values overriding config.ini, e.g. a manifest entry
+
+        Returns:
+        str: Source language
+        """
+        if overrides is not None and self.language_key in overrides:
+            return overrides[self.language_key]
+        return config[self.section][self.language_key]
+
+    def validate(self, text):
+        """Check a text against the constraints of AppStoreConnect before sending it
+
+        Args:
+        text (str): Text
+
+        Returns:
+        str: Why the text would be rejected, or None if it is valid
+        """
+        if self.max_length is not None and len(text) > self.max_length:
+            return f"{self.title} too long: {len(text)} > {self.max_length} characters"
+        match = CONTROL_CHARACTERS.search(text)
+        if match is not None:
+            return f"{self.title} contains control character U+{ord(match.group()):04X}"
+        return None
+
+    def update(self, token, app_version_localization_id, text):
+        """Update the field of a given localization
+
+        Args:
+        token (str or TokenProvider): AppStoreConnect API token
+        app_version_localization_id (str): AppStoreConnect localization id
+        text (str): Text
+
+        Returns:
+        int: HTTP status code
+        """
+        return update_localization(token, app_version_localization_id, {self.attribute: text})
+
+
+FIELDS = {}
+
+
+def register_field(field):
+    """Register a field, making it selectable with --fields
+
+    Args:
+    field (Field): Field
+
+    Returns:
+    Field: The registered field
+    """
+    FIELDS[field.name] = field
+    return field
+
+
+def get_field_by_attribute(attribute):
+    """Get the registered field of a localization attribute
+
+    Args:
+    attribute (str): Localization attribute, e.g. "whatsNew"
+
+    Returns:
+    Field: Field or None if no field is registered for the attribute
+    """
+    for field in FIELDS.values():
+        if field.attribute == attribute:
+            return field
+    return None
+
+
+CHANGELOG = register_field(Field("changelog", "whatsNew", "Changelog", "Changelog", 4000))
+DESCRIPTION = register_field(Field("description", "description", "Description", "Description", 4000))
+KEYWORDS = register_field(Field("keywords", "keywords", "Keywords", "Keywords", 100))
+PROMOTIONAL_TEXT = register_field(Field("promotional_text", "promotionalText", "PromotionalText", "Promotional text",
+                                        170))
@@ -0,0 +1,193 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from appstore import find_app_id, get_prerelease_versions, get_version_localizations
+from pipeline import collect_summary, submit_updates
+
+
+def load_manifest(manifest_path):
+    """Load a manifest of apps to update
+
+    The manifest is a JSON or YAML file containing a list of apps, either at the top level or under the key "apps".
+    Each app has the keys:
+    app: Bundle id or numeric app id
+    version (optional): Version string of the prerelease version, required if the app has several
+    platform (optional): Platform of the version, e.g. IOS or MAC_OS
+    <field>_path, <field>_language (optional): Source text path and language of a field, e.g. changelog_path,
+    defaulting to config.ini
+    text_path, language (optional): Source text path and language when a single field is updated
+
+    Args:
+    manifest_path (str): Path to the manifest
+
+    Returns:
+    list: List of apps
+    """
+    with open(manifest_path, 'r') as f:
+        if os.path.splitext(manifest_path)[1].lower() in ('.yaml', '.yml'):
+            import yaml
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+
+    if isinstance(manifest, dict):
+        manifest = manifest.get("apps", [])
+
+    return manifest
+
+
+def run_manifest(translator, token, manifest, fields, config, workers=1, cache=None, journal=None,
+                 metadata_cache=None):
+    """Update all apps of a manifest without user interaction
+
+    Apps are resolved and their localizations translated and updated on one shared pool of `workers` threads, which
+    limits the concurrency of the whole run.
+
+    Args:
+    translator (deepl.Translator): Deepl translator
+    token (str or TokenProvider): AppStoreConnect API token
+    manifest (list): Apps loaded by load_manifest
+    fields (list): Fields to update
+    config (configparser.ConfigParser): Parsed config.ini with the default source texts
+    workers (int): Number of parallel workers
+    cache (TranslationCache): Optional translation cache
+    journal (Journal): Optional resume journal
+    metadata_cache (MetadataCache): Optional cache of apps and versions
+
+    Returns:
+    dict: Report with one entry per app and the totals of the run
+    """
+    texts = {}
+    sources = []
+    for entry in manifest:
+        overrides = dict(entry)
+        if len(fields) == 1:
+            overrides.setdefault(fields[0].path_key, entry.get("text_path", fields[0].source_path(config)))
+            overrides.setdefault(fields[0].language_key, entry.get("language", fields[0].source_language(config)))
+
+        entry_sources = {}
+        for field in fields:
+            path = field.source_path(config, overrides)
+            if path not in texts:
+                with open(path, 'r') as f:
+                    texts[path] = f.read()
+            entry_sources[field.attribute] = (texts[path], field.source_language(config, overrides))
+        sources.append(entry_sources)
+
+    reports = [None] * len(manifest)
+    runs = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(resolve_entry, token, entry, metadata_cache): i for i, entry in enumerate(manifest)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                reports[i] = future.result()
+            except Exception as e:
+                reports[i] = {"app": manifest[i].get("app"), "error": str(e)}
+            if reports[i].get("error") is not None:
+                continue
+
+            run = submit_updates(
+                executor,
+                translator,
+                token,
+                sources[i],
+                reports[i].pop("localizations"),
+                cache,
+                journal,
+                reports[i]["app_id"],
+                reports[i]["version_id"]
+            )
+            runs.append((i, run))
+
+        for i, run in runs:
+            reports[i].update(collect_summary(run))
+
+    return {"apps": reports, "totals": summarize_reports(reports)}
+
+
+def resolve_entry(token, entry, metadata_cache=None):
+    """Resolve app id, version and localizations of a manifest entry
+
+    Cached versions are fetched again if none of them matches the entry, e.g. because the version was created after
+    they were cached.
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    entry (dict): Manifest entry
+    metadata_cache (MetadataCache): Optional cache of apps and versions
+
+    Returns:
+    dict: Report of the app, containing an error if it could not be resolved
+    """
+    report = {"app": entry["app"], "app_id": None, "version": None, "version_id": None, "error": None}
+
+    app_id = str(entry["app"])
+    if not app_id.isdigit():
+        app_id = find_app_id(token, app_id, metadata_cache)
+        if app_id is None:
+            report["error"] = "App not found"
+            return report
+    report["app_id"] = app_id
+
+    versions = filter_versions(get_prerelease_versions(token, app_id, metadata_cache), entry)
+    if len(versions) != 1 and metadata_cache is not None:
+        metadata_cache.invalidate(f"versions/{app_id}")
+        versions = filter_versions(get_prerelease_versions(token, app_id, metadata_cache), entry)
+    if len(versions) != 1:
+        report["error"] = f"{len(versions)} matching prerelease versions found, expected 1"
+        return report
+    report["version"] = versions[0]["versionString"]
+    report["version_id"] = versions[0]["id"]
+
+    report["localizations"] = get_version_localizations(token, versions[0])
+    return report
+
+
+def filter_versions(versions, entry):
+    """Filter versions by the platform and version string of a manifest entry
+
+    Args:
+    versions (list): Prerelease versions
+    entry (dict): Manifest entry
+
+    Returns:
+    list: Matching versions
+    """
+    if "platform" in entry:
+        versions = [version for version in versions if version["platform"] == entry["platform"]]
+    if "version" in entry:
+        versions = [version for version in versions if version["versionString"] == str(entry["version"])]
+    return versions
+
+
+def summarize_reports(reports):
+    """Sum up the reports of all apps
+
+    Args:
+    reports (list): Reports of the apps
+
+    Returns:
+    dict: Number of failed apps and of updated, skipped, failed, invalid and unsupported localizations
+    """
+    totals = {"failed_apps": 0, "updated": 0, "skipped": 0, "failed": 0, "invalid": 0, "unsupported": 0}
+    for report in reports:
+        if report.get("error") is not None:
+            totals["failed_apps"] += 1
+            continue
+        for key in ("updated", "skipped", "failed", "invalid", "unsupported"):
+            totals[key] += len(report[key])
+
+    return totals
+
+
+def write_report(report, report_path):
+    """Write a report as JSON
+
+    Args:
+    report (dict): Report returned by run_manifest
+    report_path (str): Path of the report file
+    """
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,163 @@
+import csv
+import hashlib
+import json
+import os
+import threading
+
+from scheduler import DEEPL, get_scheduler
+
+DEFAULT_DIRECTORY = "glossaries"
+DEFAULT_STATE_PATH = "glossaries.json"
+
+_glossaries = None
+
+
+class GlossaryManager:
+    """Deepl glossaries synced from local CSV files, one per language pair
+
+    A file `<SOURCE>-<TARGET>.csv` (e.g. `EN-DE.csv`) holds one `term,translation` pair per line. Glossaries are not
+    regional, so `EN-DE.csv` is used for DE and `EN-PT.csv` for PT-BR and PT-PT. The id of the Deepl glossary created
+    from a file is stored with the hash of its content in `state_path`; a new glossary is only created (and the old one
+    deleted) when the content of the file changes. With `glossary_ids` resolved by sync_all of another process, the
+    manager only looks up these ids and never creates or deletes a glossary.
+    """
+
+    def __init__(self, translator, directory=DEFAULT_DIRECTORY, state_path=DEFAULT_STATE_PATH, glossary_ids=None):
+        self.translator = translator
+        self.directory = directory
+        self.state_path = state_path
+        self.read_only = glossary_ids is not None
+        self._state = {}
+        self._synced = dict(glossary_ids or {})
+        self._lock = threading.Lock()
+        if not self.read_only and os.path.isfile(state_path):
+            try:
+                with open(state_path, 'r') as f:
+                    self._state = json.load(f)
+            except ValueError:
+                self._state = {}
+
+    def get(self, source_language, target_language):
+        """Get the glossary of a language pair, creating or replacing it on Deepl if its file changed
+
+        Args:
+        source_language (str): Source language, e.g. "EN"
+        target_language (str): Deepl target language, e.g. "PT-BR"
+
+        Returns:
+        str: Deepl glossary id or None if there is no glossary for the pair
+        """
+        pair = f"{base_language(source_language)}-{base_language(target_language)}"
+        with self._lock:
+            if pair not in self._synced and not self.read_only:
+                self._synced[pair] = self._sync(pair)
+            return self._synced.get(pair)
+
+    def sync_all(self):
+        """Sync the glossaries of all files in the directory, e.g. before they are used by several processes
+
+        Returns:
+        dict: Deepl glossary ids by language pair, e.g. {"EN-DE": "..."}, to be passed as `glossary_ids`
+        """
+        for name in sorted(os.listdir(self.directory)):
+            pair, extension = os.path.splitext(name)
+            if extension.lower() == ".csv" and pair.count("-") == 1:
+                self.get(*pair.split("-"))
+        with self._lock:
+            return {pair: glossary_id for pair, glossary_id in self._synced.items() if glossary_id is not None}
+
+    def _sync(self, pair):
+        path = os.path.join(self.directory, f"{pair}.csv")
+        if not os.path.isfile(path):
+            return None
+
+        with open(path, 'rb') as f:
+            content = f.read()
+        content_hash = hashlib.sha256(content).hexdigest()
+        state = self._state.get(pair)
+        if state is not None and state["hash"] == content_hash:
+            return state["glossary_id"]
+
+        source_language, target_language = pair.split("-")
+        entries = parse_entries(content.decode("utf-8"))
+        try:
+            glossary = get_scheduler().call(DEEPL, lambda: self.translator.create_glossary(
+                f"appstoreconnect-utils {pair}", source_language, target_language, entries
+            ))
+        except Exception as e:
+            print(f"Could not create Deepl glossary from {path}: {e}")
+            return None
+        print(f"Created Deepl glossary {glossary.glossary_id} from {path}")
+
+        if state is not None:
+            try:
+                get_scheduler().call(DEEPL, lambda: self.translator.delete_glossary(state["glossary_id"]))
+            except Exception as e:
+                print(f"Could not delete outdated Deepl glossary {state['glossary_id']}: {e}")
+
+        self._state[pair] = {"hash": content_hash, "glossary_id": glossary.glossary_id}
+        with open(self.state_path, 'w') as f:
+            json.dump(self._state, f, indent=2)
+        return glossary.glossary_id
+
+
+def parse_entries(content):
+    """Parse the entries of a glossary file
+
+    Args:
+    content (str): CSV content, one term and its translation per line
+
+    Returns:
+    dict: Translations by term
+    """
+    entries = {}
+    for row in csv.reader(content.splitlines()):
+        if len(row) >= 2 and row[0].strip() and row[1].strip():
+            entries[row[0].strip()] = row[1].strip()
+    return entries
+
+
+def base_language(language):
+    """Remove the regional variant of a language, glossaries are not regional
+
+    Args:
+    language (str): Language, e.g. "EN-US"
+
+    Returns:
+    str: Language without variant, e.g. "EN"
+    """
+    return str(language).upper().split("-")[0]
+
+
+def get_glossaries():
+    """Get the configured glossary manager
+
+    Returns:
+    GlossaryManager: Glossary manager or None if glossaries are not used
+    """
+    return _glossaries
+
+
+def configure_glossaries(glossaries):
+    """Set the glossary manager used by the translate functions
+
+    Args:
+    glossaries (GlossaryManager): Glossary manager or None to translate without glossaries
+    """
+    global _glossaries
+    _glossaries = glossaries
+
+
+def setup_glossaries(translator, directory=DEFAULT_DIRECTORY):
+    """Use the glossaries of a directory if it exists
+
+    Args:
+    translator (deepl.Translator): Deepl translator
+    directory (str): Directory of the glossary files
+
+    Returns:
+    GlossaryManager: Configured glossary manager or None if the directory does not exist
+    """
+    glossaries = GlossaryManager(translator, directory) if os.path.isdir(directory) else None
+    configure_glossaries(glossaries)
+    return glossaries
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import threading
+
+DEFAULT_PATH = "journal.jsonl"
+
+
+class Journal:
+    """Append-only journal of translated and written localizations
+
+    Every entry is keyed by app id, version id, locale and field, and stores the hash of the source text it was made
+    for. Entries are flushed to disk immediately, so after a crash a run started with `resume` skips localizations
+    that were already written and reuses translations that were paid for but not written yet.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, resume=False):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        if resume and os.path.isfile(path):
+            self._load()
+            self._truncate_partial_line()
+        self._file = open(path, 'a' if resume else 'w')
+
+    def get_translation(self, key, content_hash):
+        """Get a journaled translation
+
+        Args:
+        key (tuple): App id, version id, locale and field
+        content_hash (str): Hash of the source text, see content_hash
+
+        Returns:
+        str: Translation or None if no translation of this source text was journaled
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry["hash"] != content_hash:
+            return None
+        return entry.get("translation")
+
+    def is_written(self, key, content_hash):
+        """Check whether the translation of a source text was already written
+
+        Args:
+        key (tuple): App id, version id, locale and field
+        content_hash (str): Hash of the source text, see content_hash
+
+        Returns:
+        bool: True if written
+        """
+        entry = self._entries.get(key)
+        return entry is not None and entry["hash"] == content_hash and entry["state"] == "written"
+
+    def record_translated(self, key, content_hash, translation):
+        """Record a translation that is about to be written
+
+        Args:
+        key (tuple): App id, version id, locale and field
+        content_hash (str): Hash of the source text, see content_hash
+        translation (str): Translated text
+        """
+        self._append(key, {"hash": content_hash, "state": "translated", "translation": translation})
+
+    def record_written(self, key, content_hash):
+        """Record that a translation was written
+
+        Args:
+        key (tuple): App id, version id, locale and field
+        content_hash (str): Hash of the source text, see content_hash
+        """
+        self._append(key, {"hash": content_hash, "state": "written"})
+
+    def close(self):
+        """Close the journal file"""
+        with self._lock:
+            self._file.close()
+
+    def _append(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            line = dict(zip(("app_id", "version_id", "locale", "field"), key), **entry)
+            self._file.write(json.dumps(line) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def _load(self):
+        with open(self.path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    key = (entry.pop("app_id"), entry.pop("version_id"), entry.pop("locale"), entry.pop("field"))
+                    if "hash" in entry and "state" in entry:
+                        self._entries[key] = entry
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    # the last line may be incomplete if the process died while writing it, others may lack fields
+                    continue
+
+    def _truncate_partial_line(self):
+        # a line torn by a crash would otherwise be joined with the first entry appended after resuming
+        with open(self.path, 'rb+') as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.seek(0)
+                f.truncate(f.read().rfind(b"\n") + 1)
+
+
+def content_hash(text, source_language):
+    """Hash a source text and its language
+
+    Args:
+    text (str): Source text
+    source_language (str): Source language
+
+    Returns:
+    str: Hash
+    """
+    return hashlib.sha256(f"{source_language}\n{text}".encode("utf-8")).hexdigest()
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+
+DEFAULT_LANGUAGES_PATH = "deepl_languages.json"
+DEFAULT_LANGUAGES_TTL = 7 * 24 * 3600
+
+# Deepl target languages used until the supported languages were loaded from Deepl
+BUILTIN_TARGET_LANGUAGES = {
+    "BG", "CS", "DA", "DE", "EL", "EN-GB", "EN-US", "ES", "ET", "FI", "FR", "HU", "ID", "IT", "JA", "KO", "LT", "LV",
+    "NB", "NL", "PL", "PT-BR", "PT-PT", "RO", "RU", "SK", "SL", "SV", "TR", "UK", "ZH",
+}
+
+# Deepl target languages for App Store locales, in order of preference
+LOCALE_TARGETS = {
+    "ar-SA": ["AR"],
+    "en-AU": ["EN-GB"],
+    "en-CA": ["EN-US"],
+    "en-GB": ["EN-GB"],
+    "en-US": ["EN-US"],
+    "es-ES": ["ES"],
+    "es-MX": ["ES-419", "ES"],
+    "fr-CA": ["FR"],
+    "fr-FR": ["FR"],
+    "no": ["NB"],
+    "pt-BR": ["PT-BR"],
+    "pt-PT": ["PT-PT"],
+    "zh-Hans": ["ZH-HANS", "ZH"],
+    "zh-Hant": ["ZH-HANT"],
+}
+
+# Deepl target languages for App Store locales missing above, by language, in order of preference
+LANGUAGE_TARGETS = {
+    "en": ["EN-US"],
+    "no": ["NB"],
+    "pt": ["PT-BR", "PT-PT"],
+    "zh": [],
+}
+
+
+class LocaleRegistry:
+    """Mapping of App Store locales to the Deepl target languages they are translated into
+
+    A locale is looked up in LOCALE_TARGETS first; unknown locales fall back to the entries of their language in
+    LANGUAGE_TARGETS, or else to the language itself (de-AT -> DE). The first candidate supported by Deepl wins.
+    """
+
+    def __init__(self, target_languages=BUILTIN_TARGET_LANGUAGES, locale_targets=LOCALE_TARGETS,
+                 language_targets=LANGUAGE_TARGETS):
+        self.target_languages = {language.upper() for language in target_languages}
+        self.locale_targets = locale_targets
+        self.language_targets = language_targets
+
+    def resolve(self, locale):
+        """Get the Deepl target language of an App Store locale
+
+        Args:
+        locale (str): App Store locale, e.g. "de-DE"
+
+        Returns:
+        str: Deepl target language or None if the locale is not supported
+        """
+        for candidate in self.candidates(locale):
+            if candidate in self.target_languages:
+                return candidate
+        return None
+
+    def candidates(self, locale):
+        """Get all Deepl target languages of an App Store locale, in order of preference
+
+        Args:
+        locale (str): App Store locale
+
+        Returns:
+        list: Deepl target languages
+        """
+        if locale in self.locale_targets:
+            return self.locale_targets[locale]
+        language = locale.split("-")[0].lower()
+        if language in self.language_targets:
+            return self.language_targets[language]
+        return [language.upper()]
+
+
+_registry = LocaleRegistry()
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Get the shared locale registry
+
+    Returns:
+    LocaleRegistry: Shared registry
+    """
+    with _registry_lock:
+        return _registry
+
+
+def configure_registry(registry):
+    """Replace the shared locale registry
+
+    Args:
+    registry (LocaleRegistry): New shared registry
+
+    Returns:
+    LocaleRegistry: Shared registry
+    """
+    global _registry
+    with _registry_lock:
+        _registry = registry
+        return _registry
+
+
+def load_target_languages(translator, languages_path=DEFAULT_LANGUAGES_PATH, ttl=DEFAULT_LANGUAGES_TTL):
+    """Load the target languages supported by Deepl, cached on disk for `ttl` seconds
+
+    Falls back to a stale cache or BUILTIN_TARGET_LANGUAGES if Deepl can't be reached. A corrupt cache file is
+    treated as missing.
+
+    Args:
+    translator (deepl.Translator): Deepl translator
+    languages_path (str): Path of the cache file
+    ttl (float): Seconds the cache file is used before the languages are loaded again
+
+    Returns:
+    set: Deepl target language codes
+    """
+    cached_languages = None
+    if os.path.isfile(languages_path):
+        try:
+            with open(languages_path, 'r') as f:
+                cached = json.load(f)
+            loaded_at, cached_languages = float(cached["loaded_at"]), set(cached["target_languages"])
+        except (ValueError, KeyError, TypeError):
+            cached_languages = None
+        else:
+            if time.time() - loaded_at < ttl:
+                return cached_languages
+
+    try:
+        target_languages = {language.code.upper() for language in translator.get_target_languages()}
+    except Exception as e:
+        print(f"Could not load Deepl target languages: {e}")
+        return cached_languages if cached_languages is not None else set(BUILTIN_TARGET_LANGUAGES)
+
+    with open(languages_path, 'w') as f:
+        json.dump({"loaded_at": time.time(), "target_languages": sorted(target_languages)}, f)
+    return target_languages
@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+import time
+
+DEFAULT_PATH = "metadata_cache.json"
+DEFAULT_TTL_MINUTES = 60
+
+
+class MetadataCache:
+    """Local snapshot of AppStoreConnect metadata (apps and versions) stored as JSON
+
+    Entries are used for `ttl` seconds. Expired entries are revalidated with If-None-Match if the API returned an
+    ETag for them, otherwise fetched again. With `refresh` all entries are fetched again.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL_MINUTES * 60, refresh=False):
+        self.path = path
+        self.ttl = ttl
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        if os.path.isfile(path):
+            try:
+                with open(path, 'r') as f:
+                    self._entries = json.load(f)
+            except ValueError:
+                self._entries = {}
+
+    def fetch(self, key, fetch, compact=None):
+        """Get a cached value, fetching or revalidating it if needed
+
+        Args:
+        key (str): Cache key, e.g. "versions/<app id>"
+        fetch (function): Function called with the cached ETag (or None), returning the status code, the fetched
+        items (None if not modified) and the ETag of the response
+        compact (function): Function converting the fetched items to the stored ones, e.g. to drop texts that must
+        not be served from the cache
+
+        Returns:
+        list: Cached or fetched items, the outdated cached items or an empty list if fetching failed
+        """
+        with self._lock:
+            entry = None if self.refresh else self._entries.get(key)
+        if entry is not None and time.time() - entry["fetched_at"] < self.ttl:
+            self.hits += 1
+            return entry["value"]
+
+        status_code, items, etag = fetch(entry["etag"] if entry is not None else None)
+        if status_code == 304 and entry is not None:
+            self.revalidations += 1
+            entry["fetched_at"] = time.time()
+            self._store(key, entry)
+            return entry["value"]
+
+        self.misses += 1
+        if status_code != 200:
+            return entry["value"] if entry is not None else []
+
+        value = items if compact is None else compact(items)
+        self._store(key, {"value": value, "etag": etag, "fetched_at": time.time()})
+        return items
+
+    def invalidate(self, key):
+        """Remove an entry, so it is fetched again on next use
+
+        Args:
+        key (str): Cache key
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            with open(self.path, 'w') as f:
+                json.dump(self._entries, f)
+
+
+def setup_metadata_cache(cache_settings, refresh=False):
+    """Setup the metadata cache from the optional [Cache] section of config.ini
+
+    Args:
+    cache_settings (CacheSettings): Cache settings
+    refresh (bool): Fetch all metadata again instead of using the cache
+
+    Returns:
+    MetadataCache: Metadata cache or None if disabled
+    """
+    if not cache_settings.metadata_enabled:
+        return None
+
+    return MetadataCache(cache_settings.metadata_path, cache_settings.metadata_ttl_minutes * 60, refresh)
@@ -0,0 +1,211 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Cumulative histogram of observed values"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Add an observed value
+
+        Args:
+        value (float): Observed value
+        """
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by linear interpolation within its bucket
+
+        Args:
+        q (float): Quantile between 0 and 1, e.g. 0.99
+
+        Returns:
+        float: Estimated value, the largest bucket bound if the quantile is beyond it, or None without observations
+        """
+        if self.count == 0:
+            return None
+
+        rank = q * self.count
+        lower_bound, lower_count = 0.0, 0
+        for bound, count in zip(self.buckets, self.counts):
+            if count >= rank:
+                if count == lower_count:
+                    return bound
+                return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+            lower_bound, lower_count = bound, count
+
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Thread-safe registry of counters and histograms
+
+    Metrics are identified by a name and optional labels, e.g. http_requests_total{upstream="deepl",status="200"}.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """Increment a counter
+
+        Args:
+        name (str): Name of the counter
+        value (float): Increment
+        labels: Labels of the counter
+        """
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Add an observed value to a histogram
+
+        Args:
+        name (str): Name of the histogram
+        value (float): Observed value
+        labels: Labels of the histogram
+        """
+        key = (name, _labels(labels))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def time(self, name, **labels):
+        """Observe the duration of a block in seconds
+
+        Args:
+        name (str): Name of the histogram
+        labels: Labels of the histogram
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def histogram(self, name, **labels):
+        """Get a histogram
+
+        Args:
+        name (str): Name of the histogram
+        labels: Labels of the histogram
+
+        Returns:
+        Histogram: Histogram or None if nothing was observed
+        """
+        with self._lock:
+            return self.histograms.get((name, _labels(labels)))
+
+    def reset(self):
+        """Remove all metrics"""
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def merge(self, data, **labels):
+        """Add metrics exported by to_dict, e.g. by another process
+
+        Args:
+        data (dict): Exported counters and histograms
+        labels: Labels added to every merged metric
+        """
+        for counter in data["counters"]:
+            self.inc(counter["name"], counter["value"], **counter["labels"], **labels)
+        for exported in data["histograms"]:
+            key = (exported["name"], _labels(dict(exported["labels"], **labels)))
+            with self._lock:
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(tuple(float(bound) for bound in exported["buckets"]))
+                histogram = self.histograms[key]
+                histogram.count += exported["count"]
+                histogram.sum += exported["sum"]
+                for i, count in enumerate(exported["buckets"].values()):
+                    histogram.counts[i] += count
+
+    def to_dict(self):
+        """Export all metrics
+
+        Returns:
+        dict: Counters and histograms
+        """
+        with self._lock:
+            return {
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                "histograms": [{"name": name, "labels": dict(labels), "count": histogram.count, "sum": histogram.sum,
+                                "buckets": dict(zip([str(bound) for bound in histogram.buckets], histogram.counts))}
+                               for (name, labels), histogram in sorted(self.histograms.items())]
+            }
+
+    def to_prometheus(self):
+        """Export all metrics in the Prometheus text format
+
+        Returns:
+        str: Metrics
+        """
+        lines = []
+        typed = set()
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} histogram")
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def write_metrics(metrics_path, registry=REGISTRY):
+    """Write metrics as Prometheus textfile (.prom) or JSON (any other extension)
+
+    Args:
+    metrics_path (str): Path of the metrics file
+    registry (MetricsRegistry): Registry to export
+    """
+    with open(metrics_path, 'w') as f:
+        if os.path.splitext(metrics_path)[1].lower() == '.prom':
+            f.write(registry.to_prometheus())
+        else:
+            json.dump(registry.to_dict(), f, indent=2)
+
+
+def _labels(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+LOCALES = ["en-US", "zh-Hans", "cs", "da", "nl-NL", "fi", "fr-FR", "de-DE", "el", "hu", "id", "it", "ja", "pl",
+           "pt-PT", "ro", "ru", "sk", "es-ES", "sv", "tr", "uk", "en-GB", "et", "ko", "lt", "lv", "nb", "pt-BR", "sl",
+           "ar-SA", "ca", "hr", "he", "hi", "ms", "th", "vi", "zh-Hant", "es-MX"]
+
+
+class MockServer:
+    """Local HTTP server standing in for an upstream API
+
+    Every request waits `latency` seconds and fails with a 500 with probability `error_rate` or with a 429 with
+    probability `rate_limit_rate`. The server runs in a background thread until stopped.
+    """
+
+    def __init__(self, handler_class, latency=0.0, error_rate=0.0, rate_limit_rate=0.0, retry_after=1):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self):
+        """Start serving in a background thread
+
+        Returns:
+        MockServer: The server
+        """
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving"""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Request handler applying the latency and failures of its MockServer"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def handle_mocked(self, method):
+        mock = self.server.mock
+        with mock._lock:
+            mock.requests += 1
+
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        if mock.latency:
+            time.sleep(mock.latency)
+
+        chance = random.random()
+        if chance < mock.rate_limit_rate:
+            self.send_json(429, {"errors": [{"status": "429", "code": "RATE_LIMIT_EXCEEDED"}]},
+                           {"Retry-After": str(mock.retry_after)})
+        elif chance < mock.rate_limit_rate + mock.error_rate:
+            self.send_json(500, {"errors": [{"status": "500", "code": "UNEXPECTED_ERROR"}]})
+        else:
+            getattr(self, f"mock_{method}")(urlparse(self.path), body)
+
+    def do_GET(self):
+        self.handle_mocked("get")
+
+    def do_POST(self):
+        self.handle_mocked("post")
+
+    def do_PATCH(self):
+        self.handle_mocked("patch")
+
+    def send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode("utf-8")
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if status == 200 and self.command == "GET" and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 200 and self.command == "GET":
+            self.send_header("ETag", etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def mock_get(self, url, body):
+        self.send_json(404, {"errors": [{"status": "404"}]})
+
+    def mock_post(self, url, body):
+        self.send_json(404, {"errors": [{"status": "404"}]})
+
+    def mock_patch(self, url, body):
+        self.send_json(404, {"errors": [{"status": "404"}]})
+
+
+class AppStoreConnectHandler(MockHandler):
+    """Stand-in for the AppStoreConnect endpoints used by this tool
+
+    Every app has one prerelease version `<app id>-v` with `server.locales` localizations `<version id>-<locale>`.
+    """
+
+    def mock_get(self, url, body):
+        parts = url.path.strip("/").split("/")
+        query = parse_qs(url.query)
+        if parts == ["v1", "apps"]:
+            bundle_id = query.get("filter[bundleId]", ["com.example.app"])[0]
+            app_id = str(abs(hash(bundle_id)) % 10 ** 9)
+            self.send_json(200, {"data": [{"type": "apps", "id": app_id,
+                                           "attributes": {"bundleId": bundle_id, "name": bundle_id}}]})
+        elif len(parts) == 4 and parts[1] == "apps" and parts[3] == "appStoreVersions":
+            self.send_versions(f"{parts[2]}-v", query)
+        elif len(parts) == 4 and parts[1] == "appStoreVersions" and parts[3] == "appStoreVersionLocalizations":
+            self.send_localizations(url, parts[2], query)
+        else:
+            super().mock_get(url, body)
+
+    def send_versions(self, version_id, query):
+        version = {"type": "appStoreVersions", "id": version_id,
+                   "attributes": {"platform": "IOS", "versionString": "1.0"}}
+        body = {"data": [version], "links": {}}
+        if "appStoreVersionLocalizations" in query.get("include", [""])[0].split(","):
+            limit = int(query.get("limit[appStoreVersionLocalizations]", ["10"])[0])
+            locales = LOCALES[:self.server.mock.locales]
+            body["included"] = self.build_localizations(version_id, locales[:limit])
+            version["relationships"] = {"appStoreVersionLocalizations": {
+                "data": [{"type": item["type"], "id": item["id"]} for item in body["included"]],
+                "meta": {"paging": {"total": len(locales), "limit": limit}}
+            }}
+        self.send_json(200, body)
+
+    def build_localizations(self, version_id, locales):
+        return [{"type": "appStoreVersionLocalizations", "id": f"{version_id}-{locale}",
+                 "attributes": {"locale": locale, "whatsNew": None, "description": None}} for locale in locales]
+
+    def send_localizations(self, url, version_id, query):
+        limit = int(query.get("limit", ["200"])[0])
+        offset = int(query.get("cursor", ["0"])[0])
+        locales = LOCALES[:self.server.mock.locales]
+        data = self.build_localizations(version_id, locales[offset:offset + limit])
+        links = {}
+        if offset + limit < len(locales):
+            links["next"] = f"{self.server.mock.url}{url.path}?limit={limit}&cursor={offset + limit}"
+        self.send_json(200, {"data": data, "links": links})
+
+    def mock_patch(self, url, body):
+        parts = url.path.strip("/").split("/")
+        if len(parts) == 3 and parts[1] == "appStoreVersionLocalizations":
+            data = json.loads(body)["data"]
+            self.send_json(200, {"data": {"type": "appStoreVersionLocalizations", "id": parts[2],
+                                          "attributes": data["attributes"]}})
+        else:
+            super().mock_patch(url, body)
+
+
+class DeeplHandler(MockHandler):
+    """Stand-in for the Deepl translate endpoint, "translating" by prefixing the target language"""
+
+    def mock_post(self, url, body):
+        if url.path == "/v2/translate":
+            form = parse_qs(body.decode("utf-8"))
+            target_lang = form["target_lang"][0]
+            self.send_json(200, {"translations": [{"detected_source_language": "EN", "text": f"[{target_lang}] {text}"}
+                                                  for text in form["text"]]})
+        else:
+            super().mock_post(url, body)
+
+
+def start_app_store_connect_server(locales=len(LOCALES), **kwargs):
+    """Start a local AppStoreConnect stand-in
+
+    Args:
+    locales (int): Number of localizations of every version, at most len(LOCALES)
+    kwargs: Latency and failure options, see MockServer
+
+    Returns:
+    MockServer: Running server, its API url is `<url>/v1`
+    """
+    server = MockServer(AppStoreConnectHandler, **kwargs)
+    server.locales = locales
+    return server.start()
+
+
+def start_deepl_server(**kwargs):
+    """Start a local Deepl stand-in
+
+    Args:
+    kwargs: Latency and failure options, see MockServer
+
+    Returns:
+    MockServer: Running server, usable as server_url of deepl.Translator
+    """
+    return MockServer(DeeplHandler, **kwargs).start()
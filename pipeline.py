@@ -0,0 +1,225 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from appstore import update_localization
+from fields import get_field_by_attribute
+from journal import content_hash
+from metrics import REGISTRY
+from translation import group_localizations_by_target_language, translate_documents
+
+# options of the second translation of a text that is too long, informal wording tends to be shorter
+RETRY_OPTIONS = {"formality": "prefer_less"}
+
+
+def update_localizations(translator, token, sources, localizations, workers=1, cache=None, journal=None, app_id=None,
+                         version_id=None, update_function=update_localization):
+    """Translate source texts and update them for all given localizations, with one PATCH per localization
+
+    Localizations are grouped by Deepl target language. Each group is translated with one Deepl request per source
+    language and then updated locale by locale, merging all changed attributes into a single PATCH; the groups run in
+    parallel on a pool of `workers` threads. Attributes whose current value already equals the translation are left
+    out, and localizations without changes are skipped. With a journal, attributes already written by an interrupted
+    run are skipped and their journaled translations reused. Translations are validated against the constraints of
+    their field before the PATCH; too long ones are translated again with RETRY_OPTIONS and attributes that are still
+    invalid are not sent but reported.
+
+    Args:
+    translator (deepl.Translator): Deepl translator
+    token (str or TokenProvider): AppStoreConnect API token
+    sources (dict): Source text and language by localization attribute, e.g. {"whatsNew": ("...", "EN")}
+    localizations (list): AppStoreConnect localizations
+    workers (int): Number of parallel workers
+    cache (TranslationCache): Optional translation cache
+    journal (Journal): Optional resume journal, requires app_id and version_id
+    app_id (str): App ID
+    version_id (str): AppStoreConnect version id
+    update_function (function): Function updating a localization, called with token, localization id and attributes
+
+    Returns:
+    dict: Summary with updated, skipped (unchanged or already written) and unsupported locales, and failed and invalid
+    locales with their errors
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return collect_summary(submit_updates(
+            executor, translator, token, sources, localizations, cache, journal, app_id, version_id, update_function
+        ))
+
+
+def submit_updates(executor, translator, token, sources, localizations, cache=None, journal=None, app_id=None,
+                   version_id=None, update_function=update_localization):
+    """Submit the translation and update of all given localizations to an executor without waiting for them
+
+    Allows several apps to share one pool of workers, see update_localizations for the arguments.
+
+    Args:
+    executor (concurrent.futures.Executor): Executor running the Deepl target language groups
+
+    Returns:
+    dict: Pending update run, to be passed to collect_summary
+    """
+    groups = group_localizations_by_target_language(localizations)
+    supported_ids = {localization['id'] for group in groups.values() for localization in group}
+    summary = {
+        "updated": [],
+        "skipped": [],
+        "failed": {},
+        "invalid": {},
+        "unsupported": [localization['locale'] for localization in localizations
+                        if localization['id'] not in supported_ids]
+    }
+    hashes = {attribute: content_hash(text, language) for attribute, (text, language) in sources.items()}
+
+    def journal_key(localization, attribute):
+        return app_id, version_id, localization['locale'], attribute
+
+    def translate_and_update(deepl_target_language, target_localizations):
+        # attributes still to be written for every localization
+        pending = {}
+        for localization in target_localizations:
+            pending[localization['id']] = [
+                attribute for attribute in sources
+                if journal is None or not journal.is_written(journal_key(localization, attribute), hashes[attribute])
+            ]
+
+        translations, journaled = translate_sources(deepl_target_language, target_localizations, pending)
+        invalid = validate_translations(deepl_target_language, translations)
+        if journal is not None:
+            # only valid translations are journaled, including those of a retry, so a resumed run does not reuse an
+            # invalid one and translate it again
+            for attribute, translation in translations.items():
+                if attribute in invalid or journaled.get(attribute) == translation:
+                    continue
+                for localization in target_localizations:
+                    if attribute in pending[localization['id']]:
+                        journal.record_translated(journal_key(localization, attribute), hashes[attribute], translation)
+
+        results = []
+        for localization in target_localizations:
+            valid = [attribute for attribute in pending[localization['id']] if attribute not in invalid]
+            attributes = {
+                attribute: translations[attribute] for attribute in valid
+                if localization.get(attribute) != translations[attribute]
+            }
+            status_code = update_function(token, localization['id'], attributes) if attributes else None
+            if journal is not None and status_code in (None, 200):
+                for attribute in valid:
+                    journal.record_written(journal_key(localization, attribute), hashes[attribute])
+            errors = [invalid[attribute] for attribute in pending[localization['id']] if attribute in invalid]
+            results.append((localization, status_code, errors))
+        return results
+
+    def validate_translations(deepl_target_language, translations):
+        # errors of the translations that must not be sent, too long ones are translated once more with RETRY_OPTIONS
+        invalid = {}
+        for attribute, translation in translations.items():
+            field = get_field_by_attribute(attribute)
+            if field is None or field.validate(translation) is None:
+                continue
+            if field.max_length is not None and len(translation) > field.max_length:
+                text, language = sources[attribute]
+                translation = translate_documents(translator, [text], language, deepl_target_language, cache,
+                                                  RETRY_OPTIONS)[0]
+                if field.validate(translation) is None:
+                    translations[attribute] = translation
+                    continue
+            invalid[attribute] = field.validate(translation)
+            REGISTRY.inc("validation_failures_total", field=field.name)
+        return invalid
+
+    def translate_sources(deepl_target_language, target_localizations, pending):
+        # translations of the pending attributes and those of them taken from the journal
+        translations = {}
+        for attribute in sources:
+            localizations_pending = [localization for localization in target_localizations
+                                     if attribute in pending[localization['id']]]
+            if not localizations_pending:
+                continue
+            if journal is not None:
+                translation = journal.get_translation(journal_key(localizations_pending[0], attribute),
+                                                      hashes[attribute])
+                if translation is not None:
+                    translations[attribute] = translation
+        journaled = dict(translations)
+
+        # one Deepl request per source language for all attributes that still need a translation
+        by_language = {}
+        for attribute, (text, language) in sources.items():
+            if attribute not in translations and any(attribute in attributes for attributes in pending.values()):
+                by_language.setdefault(language, []).append(attribute)
+        for language, attributes in by_language.items():
+            translated_texts = translate_documents(translator, [sources[attribute][0] for attribute in attributes],
+                                                   language, deepl_target_language, cache)
+            for attribute, translated_text in zip(attributes, translated_texts):
+                translations[attribute] = translated_text
+
+        return translations, journaled
+
+    futures = {
+        executor.submit(translate_and_update, deepl_target_language, target_localizations): target_localizations
+        for deepl_target_language, target_localizations in groups.items()
+    }
+    return {"summary": summary, "futures": futures}
+
+
+def collect_summary(run):
+    """Wait for a pending update run and summarize its results
+
+    Args:
+    run (dict): Pending update run returned by submit_updates
+
+    Returns:
+    dict: Summary with updated, skipped (unchanged or already written) and unsupported locales, and failed and invalid
+    locales with their errors
+    """
+    summary = run["summary"]
+    for future in as_completed(run["futures"]):
+        try:
+            results = future.result()
+        except Exception as e:
+            for localization in run["futures"][future]:
+                summary["failed"][localization['locale']] = str(e)
+            continue
+
+        for localization, status_code, errors in results:
+            if errors:
+                summary["invalid"][localization['locale']] = "; ".join(errors)
+            if status_code is None:
+                if not errors:
+                    summary["skipped"].append(localization['locale'])
+            elif status_code == 200:
+                summary["updated"].append(localization['locale'])
+            else:
+                summary["failed"][localization['locale']] = f"HTTP {status_code}"
+
+    return summary
+
+
+def print_summary(summary, field_name, cache=None, client=None):
+    """Print the summary of an update run
+
+    Args:
+    summary (dict): Summary returned by update_localizations
+    field_name (str): Name of the updated field, e.g. "Changelog"
+    cache (TranslationCache): Translation cache used for the run
+    client (AppStoreConnectClient): AppStoreConnect client used for the run
+    """
+    print("=== Summary ===")
+    print(f"{field_name} updated for {len(summary['updated'])} localization(s): {' '.join(sorted(summary['updated']))}")
+    print(f"Unchanged, skipped {len(summary['skipped'])} localization(s): {' '.join(sorted(summary['skipped']))}")
+    if summary["unsupported"]:
+        print(f"Not supported by Deepl: {' '.join(sorted(summary['unsupported']))}")
+    if summary["failed"]:
+        print(f"Errors for {len(summary['failed'])} localization(s):")
+        for locale, error in sorted(summary["failed"].items()):
+            print(f"{locale}: {error}")
+    if summary["invalid"]:
+        print(f"Invalid translations, not sent for {len(summary['invalid'])} localization(s):")
+        for locale, error in sorted(summary["invalid"].items()):
+            print(f"{locale}: {error}")
+    if cache is not None:
+        print(f"Translation cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+    if client is not None:
+        stats = client.connection_stats()
+        print(f"AppStoreConnect connections: {stats['connections']} opened, {stats['reused']} of "
+              f"{stats['requests']} request(s) reused a connection")
+        if "http2" in stats:
+            print(f"{stats['http2']} of {stats['requests']} request(s) sent over HTTP/2")
@@ -0,0 +1,144 @@
+import dataclasses
+from concurrent.futures import ProcessPoolExecutor
+
+from appstore import configure_client
+from appstore_token import setup_token_provider
+from fields import FIELDS
+from fleet import run_manifest, summarize_reports
+from glossaries import GlossaryManager, configure_glossaries
+from journal import DEFAULT_PATH as DEFAULT_JOURNAL_PATH
+from journal import Journal
+from locales import configure_registry
+from metadata_cache import setup_metadata_cache
+from metrics import REGISTRY
+from settings import load_settings, profile_path
+from translation import LazyTranslator
+from translation_cache import setup_translation_cache
+
+
+def run_profiles(config_file_path, registry, manifest, field_names, default_profile=None, workers=1, resume=False,
+                 refresh=False, http2=False, glossary_ids=None):
+    """Update the apps of a manifest with one worker process per credential profile
+
+    Entries select their profile with a "profile" key, entries without one use `default_profile`. Every process has
+    its own token, connection pool and rate limit budget, so teams are updated in parallel. The translation cache is
+    shared, journal and metadata cache are kept per profile. Glossaries are synced by the parent process, the workers
+    only use their ids.
+
+    Args:
+    config_file_path (str): Path to config.ini
+    registry (LocaleRegistry): Locale registry of the parent process
+    manifest (list): Apps loaded by load_manifest
+    field_names (list): Names of the fields to update
+    default_profile (str): Profile of entries without a "profile" key, None for [AppStoreConnect]
+    workers (int): Number of parallel workers of every process
+    resume (bool): Resume interrupted runs from the journals
+    refresh (bool): Fetch all metadata again instead of using the cache
+    http2 (bool): Use the HTTP/2 AppStoreConnect client
+    glossary_ids (dict): Deepl glossary ids by language pair returned by GlossaryManager.sync_all, None if glossaries
+    are not used
+
+    Returns:
+    dict: Report with one entry per app, the totals of every profile and of the whole run
+    """
+    groups = {}
+    for entry in manifest:
+        groups.setdefault(entry.get("profile", default_profile), []).append(entry)
+
+    reports = {}
+    with ProcessPoolExecutor(max_workers=len(groups)) as executor:
+        futures = {
+            profile_name: executor.submit(run_profile, config_file_path, profile_name, registry, entries, field_names,
+                                          workers, resume, refresh, http2, glossary_ids)
+            for profile_name, entries in groups.items()
+        }
+        for profile_name, future in futures.items():
+            try:
+                reports[profile_name], metrics = future.result()
+                REGISTRY.merge(metrics, profile=profile_name or "default")
+            except Exception as e:
+                reports[profile_name] = {"apps": [{"app": entry.get("app"), "error": str(e)}
+                                                  for entry in groups[profile_name]]}
+
+    apps = []
+    profiles = {}
+    for profile_name, report in reports.items():
+        for app in report["apps"]:
+            app["profile"] = profile_name
+        apps.extend(report["apps"])
+        profiles[profile_name or "default"] = summarize_reports(report["apps"])
+
+    return {"apps": apps, "profiles": profiles, "totals": summarize_reports(apps)}
+
+
+def run_profile(config_file_path, profile_name, registry, manifest, field_names, workers=1, resume=False,
+                refresh=False, http2=False, glossary_ids=None):
+    """Update the apps of one profile, run in a worker process by run_profiles
+
+    Args:
+    config_file_path (str): Path to config.ini
+    profile_name (str): Name of the profile, None for [AppStoreConnect]
+    registry (LocaleRegistry): Locale registry of the parent process
+    manifest (list): Apps of the profile
+    field_names (list): Names of the fields to update
+    workers (int): Number of parallel workers
+    resume (bool): Resume an interrupted run from the journal of the profile
+    refresh (bool): Fetch all metadata again instead of using the cache
+    http2 (bool): Use the HTTP/2 AppStoreConnect client
+    glossary_ids (dict): Deepl glossary ids synced by the parent process, None if glossaries are not used
+
+    Returns:
+    dict, dict: Report returned by run_manifest and the metrics of the process
+    """
+    settings = load_settings(config_file_path)
+    configure_registry(registry)
+    REGISTRY.reset()
+
+    translator = LazyTranslator(settings.deepl_auth_key)
+    configure_glossaries(GlossaryManager(translator, settings.glossary_directory, glossary_ids=glossary_ids)
+                         if glossary_ids is not None else None)
+    token_provider, cache, metadata_cache, journal = setup_profile(settings, profile_name, workers, resume, refresh,
+                                                                   http2)
+
+    try:
+        report = run_manifest(
+            translator,
+            token_provider,
+            manifest,
+            [FIELDS[name] for name in field_names],
+            settings.config,
+            workers=workers,
+            cache=cache,
+            journal=journal,
+            metadata_cache=metadata_cache
+        )
+    finally:
+        journal.close()
+        if cache is not None:
+            cache.close()
+
+    return report, REGISTRY.to_dict()
+
+
+def setup_profile(settings, profile_name=None, workers=1, resume=False, refresh=False, http2=False):
+    """Setup token, AppStoreConnect client, caches and journal of a profile
+
+    Args:
+    settings (Settings): Settings
+    profile_name (str): Name of the profile, None for [AppStoreConnect]
+    workers (int): Number of parallel workers, the size of the connection pool
+    resume (bool): Resume an interrupted run from the journal of the profile
+    refresh (bool): Fetch all metadata again instead of using the cache
+    http2 (bool): Use the HTTP/2 AppStoreConnect client
+
+    Returns:
+    TokenProvider, TranslationCache, MetadataCache, Journal: Token provider, caches (None if disabled) and journal
+    """
+    token_provider = setup_token_provider(settings.profile(profile_name))
+    configure_client(token_provider, pool_size=max(1, workers), http2=http2)
+    cache = setup_translation_cache(settings.cache)
+    metadata_cache = setup_metadata_cache(dataclasses.replace(
+        settings.cache, metadata_path=profile_path(settings.cache.metadata_path, profile_name)
+    ), refresh)
+    journal = Journal(profile_path(DEFAULT_JOURNAL_PATH, profile_name), resume=resume)
+    return token_provider, cache, metadata_cache, journal
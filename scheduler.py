@@ -0,0 +1,227 @@
+import random
+import sys
+import threading
+import time
+
+from metrics import REGISTRY
+
+APPSTORE_CONNECT = "appstoreconnect"
+DEEPL = "deepl"
+
+# status codes of responses that are retried with backoff
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting the request rate of one upstream
+
+    Requests reserve a token and wait until it is available. The bucket can be adjusted to the limits reported by the
+    upstream.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Reserve a token
+
+        Returns:
+        float: Seconds to wait before the token may be used
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """Reserve a token and wait until it may be used"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def update(self, limit, remaining, period):
+        """Adjust the bucket to a limit reported by the upstream
+
+        Args:
+        limit (int): Number of requests allowed per period
+        remaining (int): Number of requests remaining in the current period
+        period (float): Length of the period in seconds
+        """
+        with self._lock:
+            self._refill()
+            self.rate = limit / period
+            self.capacity = limit
+            self._tokens = min(self._tokens, remaining)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+
+class RequestScheduler:
+    """Central scheduler for all outgoing requests
+
+    Every upstream has its own token bucket. Responses with status 429 or 5xx and retryable errors are retried with
+    exponential backoff and full jitter, honoring Retry-After. App Store Connect's X-Rate-Limit header updates the
+    bucket of the upstream, so requests slow down before the quota is exhausted.
+    """
+
+    def __init__(self, buckets=None, max_retries=MAX_RETRIES, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.buckets = buckets if buckets is not None else {
+            # App Store Connect allows 3600 requests per rolling hour
+            APPSTORE_CONNECT: TokenBucket(rate=1.0, capacity=3600),
+            DEEPL: TokenBucket(rate=10.0, capacity=20),
+        }
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def call(self, upstream, send):
+        """Send a request to an upstream, waiting for the rate limit and retrying with backoff
+
+        Args:
+        upstream (str): Name of the upstream, e.g. APPSTORE_CONNECT
+        send (function): Function sending the request and returning the response
+
+        Returns:
+        object: Response of the last attempt
+        """
+        attempt = 0
+        while True:
+            self.buckets[upstream].acquire()
+            start = time.perf_counter()
+            try:
+                response, error = send(), None
+            except Exception as e:
+                response, error = None, e
+            _record_attempt(upstream, response, error, time.perf_counter() - start)
+            delay = self._retry_delay(upstream, response, error, attempt)
+            if delay is None:
+                if error is not None:
+                    raise error
+                return response
+            attempt += 1
+            time.sleep(delay)
+
+    def _retry_delay(self, upstream, response, error, attempt):
+        """Get the delay before retrying an attempt
+
+        Returns:
+        float: Seconds to wait before the next attempt or None if the attempt must not be retried
+        """
+        headers = getattr(response, "headers", None) or {}
+        rate_limit = parse_rate_limit(headers.get("X-Rate-Limit"))
+        if rate_limit is not None:
+            self.buckets[upstream].update(*rate_limit)
+
+        if error is not None:
+            retry = is_retryable_error(error)
+        else:
+            retry = getattr(response, "status_code", None) in RETRY_STATUS_CODES
+        if not retry or attempt >= self.max_retries:
+            return None
+
+        with self._lock:
+            self.retries += 1
+        REGISTRY.inc("http_retries_total", upstream=upstream)
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        retry_after = headers.get("Retry-After")
+        if retry_after is not None and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        return delay
+
+
+def _record_attempt(upstream, response, error, duration):
+    if error is not None:
+        status = getattr(error, "http_status_code", None) or "error"
+    else:
+        # responses of client libraries like deepl don't expose a status code, they raise on errors
+        status = getattr(response, "status_code", 200)
+    REGISTRY.inc("http_requests_total", upstream=upstream, status=status)
+    REGISTRY.observe("http_request_duration_seconds", duration, upstream=upstream)
+
+
+def parse_rate_limit(header):
+    """Parse App Store Connect's X-Rate-Limit header, e.g. "user-hour-lim:3600;user-hour-rem:3545;"
+
+    Args:
+    header (str): Header value
+
+    Returns:
+    tuple: Limit, remaining requests and period in seconds, or None if the header is missing or unknown
+    """
+    if not header:
+        return None
+
+    values = {}
+    for part in header.split(";"):
+        name, _, value = part.partition(":")
+        if value.strip().isdigit():
+            values[name.strip()] = int(value)
+
+    if "user-hour-lim" not in values or "user-hour-rem" not in values:
+        return None
+
+    return values["user-hour-lim"], values["user-hour-rem"], 3600.0
+
+
+def is_retryable_error(error):
+    """Check whether a failed request may be retried
+
+    Args:
+    error (Exception): Error raised by the request
+
+    Returns:
+    bool: True for connection errors (also of httpx), timeouts and Deepl errors flagged as retryable or with a
+    retryable status code
+    """
+    if getattr(error, "should_retry", False) or getattr(error, "http_status_code", None) in RETRY_STATUS_CODES:
+        return True
+    if isinstance(error, OSError):
+        return True
+    # httpx is only imported by the HTTP/2 client, its connection errors and timeouts are no OSErrors
+    httpx = sys.modules.get("httpx")
+    return httpx is not None and isinstance(error, httpx.TransportError)
+
+
+def configure_scheduler(scheduler):
+    """Replace the shared request scheduler, e.g. to change the rate limits
+
+    Args:
+    scheduler (RequestScheduler): New shared scheduler
+
+    Returns:
+    RequestScheduler: Shared scheduler
+    """
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
+        return _scheduler
+
+
+def get_scheduler():
+    """Get the shared request scheduler, creating it on first use
+
+    Returns:
+    RequestScheduler: Shared scheduler
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
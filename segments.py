@@ -0,0 +1,45 @@
+import re
+
+# paragraph breaks and line breaks in front of list items
+SEPARATOR = re.compile(r"(\n[ \t]*\n\s*|\n(?=[ \t]*(?:[-*•]|\d+[.)])[ \t]))")
+
+
+def split_segments(text):
+    """Split a text into stable segments (paragraphs and list items)
+
+    Args:
+    text (str): Text
+
+    Returns:
+    list: Segments and separators alternating, starting and ending with a segment; joining them gives the text
+    """
+    return SEPARATOR.split(text)
+
+
+def join_segments(parts):
+    """Join segments and separators split by split_segments
+
+    Args:
+    parts (list): Segments and separators
+
+    Returns:
+    str: Text
+    """
+    return "".join(parts)
+
+
+def strip_segment(segment):
+    """Split the surrounding whitespace off a segment, so it is kept as is instead of being sent to Deepl
+
+    Args:
+    segment (str): Segment
+
+    Returns:
+    str, str, str: Leading whitespace, content and trailing whitespace; the content is empty for blank segments
+    """
+    content = segment.strip()
+    if not content:
+        return segment, "", ""
+    leading = segment[:len(segment) - len(segment.lstrip())]
+    trailing = segment[len(segment.rstrip()):]
+    return leading, content, trailing
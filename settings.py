@@ -0,0 +1,128 @@
+import configparser
+import os
+from dataclasses import dataclass, field
+
+import glossaries
+import metadata_cache
+import translation_cache
+
+# sections of additional credential profiles, e.g. [AppStoreConnect:team-b]
+PROFILE_SECTION_PREFIX = "AppStoreConnect:"
+
+
+@dataclass
+class CacheSettings:
+    """Optional [Cache] section of config.ini"""
+    enabled: bool = True
+    path: str = translation_cache.DEFAULT_PATH
+    max_entries: int = translation_cache.DEFAULT_MAX_ENTRIES
+    max_age_days: float = translation_cache.DEFAULT_MAX_AGE_DAYS
+    metadata_enabled: bool = True
+    metadata_path: str = metadata_cache.DEFAULT_PATH
+    metadata_ttl_minutes: float = metadata_cache.DEFAULT_TTL_MINUTES
+
+
+@dataclass
+class Profile:
+    """AppStoreConnect credentials of a team, [AppStoreConnect] or [AppStoreConnect:<name>] in config.ini"""
+    name: str
+    key_id: str = None
+    key_file_path: str = None
+    issuer_id: str = None
+
+    @property
+    def section(self):
+        return "AppStoreConnect" if self.name is None else PROFILE_SECTION_PREFIX + self.name
+
+
+@dataclass
+class Settings:
+    """Settings of config.ini, read once and passed to everything that needs them
+
+    The source text sections of the fields stay in `config`, since manifest entries can override them.
+    """
+    path: str
+    config: configparser.ConfigParser
+    deepl_auth_key: str = None
+    glossary_directory: str = glossaries.DEFAULT_DIRECTORY
+    key_id: str = None
+    key_file_path: str = None
+    issuer_id: str = None
+    cache: CacheSettings = field(default_factory=CacheSettings)
+    profiles: dict = field(default_factory=dict)
+
+    def profile(self, name=None):
+        """Get the credentials of a profile
+
+        Args:
+        name (str): Name of the profile, None for the [AppStoreConnect] section
+
+        Returns:
+        Profile: Credentials or None if there is no such profile
+        """
+        if name is None:
+            return Profile(None, self.key_id, self.key_file_path, self.issuer_id)
+        return self.profiles.get(name)
+
+
+def load_settings(config_file_path):
+    """Read config.ini, missing files and keys are left to validate_config
+
+    Args:
+    config_file_path (str): Path to config.ini
+
+    Returns:
+    Settings: Settings
+    """
+    config = configparser.ConfigParser()
+    config.read(config_file_path)
+    settings = Settings(
+        config_file_path,
+        config,
+        config.get('Deepl', 'auth_key', fallback=None),
+        config.get('Deepl', 'glossary_directory', fallback=glossaries.DEFAULT_DIRECTORY),
+        config.get('AppStoreConnect', 'key_id', fallback=None),
+        config.get('AppStoreConnect', 'key_file_path', fallback=None),
+        config.get('AppStoreConnect', 'issuer_id', fallback=None)
+    )
+
+    for section in config.sections():
+        if section.startswith(PROFILE_SECTION_PREFIX):
+            name = section[len(PROFILE_SECTION_PREFIX):]
+            settings.profiles[name] = Profile(
+                name,
+                config.get(section, 'key_id', fallback=None),
+                config.get(section, 'key_file_path', fallback=None),
+                config.get(section, 'issuer_id', fallback=None)
+            )
+
+    if 'Cache' in config:
+        section = config['Cache']
+        defaults = settings.cache
+        settings.cache = CacheSettings(
+            section.getboolean('enabled', defaults.enabled),
+            section.get('path', defaults.path),
+            section.getint('max_entries', defaults.max_entries),
+            section.getfloat('max_age_days', defaults.max_age_days),
+            section.getboolean('metadata_enabled', defaults.metadata_enabled),
+            section.get('metadata_path', defaults.metadata_path),
+            section.getfloat('metadata_ttl_minutes', defaults.metadata_ttl_minutes)
+        )
+
+    return settings
+
+
+def profile_path(path, profile_name):
+    """Get the path of a per-profile file, e.g. journal.team-b.jsonl, so processes of different profiles don't share it
+
+    Args:
+    path (str): Path of the file of the [AppStoreConnect] profile
+    profile_name (str): Name of the profile, None for the [AppStoreConnect] section
+
+    Returns:
+    str: Path
+    """
+    if profile_name is None:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.{profile_name}{extension}"
@@ -0,0 +1,184 @@
+import threading
+
+from glossaries import get_glossaries
+from locales import get_registry
+from metrics import REGISTRY
+from scheduler import DEEPL, get_scheduler
+from segments import join_segments, split_segments, strip_segment
+
+
+class LazyTranslator:
+    """Deepl translator which imports deepl and constructs the `deepl.Translator` on first use
+
+    Runs that stop before translating, or find every translation in the cache, never pay for the import.
+    """
+
+    def __init__(self, auth_key, **kwargs):
+        self.auth_key = auth_key
+        self.kwargs = kwargs
+        self._translator = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+    def get(self):
+        """Get the Deepl translator, creating it on first use
+
+        Returns:
+        deepl.Translator: Deepl translator
+        """
+        with self._lock:
+            if self._translator is None:
+                import deepl
+
+                self._translator = deepl.Translator(self.auth_key, **self.kwargs)
+            return self._translator
+
+
+def translate_for_localizations(translator, texts, source_language, localizations, cache=None):
+    """Translate texts for all given localizations, sending one Deepl request per target language
+
+    Localizations sharing a Deepl target language are translated once and all texts (e.g. changelog and
+    description) are sent together in the same request.
+
+    Args:
+    translator (deepl.Translator): Deepl translator
+    texts (list): Source texts
+    source_language (str): Source language of the texts
+    localizations (list): AppStoreConnect localizations
+    cache (TranslationCache): Optional translation cache
+
+    Returns:
+    dict: Translated texts (list in the same order as texts) by localization id
+    """
+    translations = {}
+    for deepl_target_language, target_localizations in group_localizations_by_target_language(localizations).items():
+        locales = ", ".join(localization['locale'] for localization in target_localizations)
+        print(f"Translating {len(texts)} text(s) from {source_language} to {locales}...")
+        translated_texts = translate_documents(translator, texts, source_language, deepl_target_language, cache)
+        for localization in target_localizations:
+            translations[localization['id']] = translated_texts
+
+    return translations
+
+
+def translate_documents(translator, texts, source_language, deepl_target_language, cache=None, options=None):
+    """Translate multiple texts segment by segment, sending only new or edited segments to Deepl
+
+    With a cache, the texts are split into paragraphs and list items which are cached individually, so after a small
+    edit only the changed segments are translated (in a single Deepl request) and the texts are reassembled from cached
+    and new translations. Without a cache the texts are translated as a whole.
+
+    Args:
+    translator (deepl.Translator): Deepl translator
+    texts (list): Source texts
+    source_language (str): Source language of the texts
+    deepl_target_language (str): Deepl target language
+    cache (TranslationCache): Optional translation cache
+    options (dict): Optional translation options passed to Deepl, e.g. {"formality": "prefer_less"}
+
+    Returns:
+    list: Translated texts in the same order as texts
+    """
+    if cache is None:
+        return translate_texts(translator, texts, source_language, deepl_target_language, options=options)
+
+    documents = [[strip_segment(segment) for segment in split_segments(text)[::2]] for text in texts]
+    contents = list(dict.fromkeys(content for segments in documents for _, content, _ in segments if content))
+    translated_contents = dict(zip(
+        contents, translate_texts(translator, contents, source_language, deepl_target_language, cache, options)
+    ))
+
+    translated_texts = []
+    for text, segments in zip(texts, documents):
+        parts = split_segments(text)
+        for i, (leading, content, trailing) in enumerate(segments):
+            if content:
+                parts[2 * i] = leading + translated_contents[content] + trailing
+        translated_texts.append(join_segments(parts))
+
+    return translated_texts
+
+
+def translate_texts(translator, texts, source_language, deepl_target_language, cache=None, options=None):
+    """Translate multiple texts into one target language with a single Deepl request
+
+    Texts found in the cache are not sent to Deepl; if all texts are cached no request is made. The glossary of the
+    language pair, if any, is passed to Deepl and becomes part of the cache key, so texts are translated again when the
+    glossary changes.
+
+    Args:
+    translator (deepl.Translator): Deepl translator
+    texts (list): Source texts
+    source_language (str): Source language of the texts
+    deepl_target_language (str): Deepl target language
+    cache (TranslationCache): Optional translation cache
+    options (dict): Optional translation options passed to Deepl, part of the cache key
+
+    Returns:
+    list: Translated texts in the same order as texts
+    """
+    glossaries = get_glossaries()
+    glossary_id = glossaries.get(source_language, deepl_target_language) if glossaries is not None else None
+    if glossary_id is not None:
+        options = dict(options or {}, glossary=glossary_id)
+
+    translated_texts = [None] * len(texts)
+    if cache is not None:
+        for i, text in enumerate(texts):
+            translated_texts[i] = cache.get(text, source_language, deepl_target_language, options)
+
+    missing = [i for i, translated_text in enumerate(translated_texts) if translated_text is None]
+    if not missing:
+        return translated_texts
+
+    with REGISTRY.time("stage_duration_seconds", stage="translate"):
+        results = get_scheduler().call(DEEPL, lambda: translator.translate_text(
+            [texts[i] for i in missing],
+            target_lang=deepl_target_language,
+            source_lang=source_language,
+            **(options or {})
+        ))
+    REGISTRY.inc("deepl_characters_total", sum(len(texts[i]) for i in missing))
+    for i, result in zip(missing, results):
+        translated_texts[i] = result.text
+        if cache is not None:
+            cache.set(texts[i], source_language, deepl_target_language, result.text, options)
+
+    return translated_texts
+
+
+def group_localizations_by_target_language(localizations):
+    """Group localizations by their Deepl target language
+
+    Locales sharing a target language (e.g. de-DE and de-AT) end up in the same group, so the text is translated once
+    and fanned out to all of them. Localizations not supported by Deepl are reported and left out.
+
+    Args:
+    localizations (list): AppStoreConnect localizations
+
+    Returns:
+    dict: Lists of localizations by Deepl target language
+    """
+    groups = {}
+    for localization in localizations:
+        deepl_target_language = convert_appstore_language_code_to_deepl_language(localization['locale'])
+        if deepl_target_language is None:
+            print(f"Language {localization['locale']} not supported by Deepl")
+            continue
+        groups.setdefault(deepl_target_language, []).append(localization)
+
+    return groups
+
+
+def convert_appstore_language_code_to_deepl_language(language_code):
+    """Convert AppStore language code to Deepl language code
+
+    Args:
+    language_code (str): AppStore language code
+
+    Returns:
+    str: Deepl language code
+    """
+    return get_registry().resolve(language_code)
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from metrics import REGISTRY
+
+DEFAULT_PATH = "translation_cache.sqlite"
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_AGE_DAYS = 90
+
+
+class TranslationCache:
+    """Persistent cache of Deepl translations stored in SQLite
+
+    Entries are keyed by the hash of the source text, the source and target language and the translation options.
+    Entries older than `max_age_days` and, beyond `max_entries`, the least recently used ones are evicted.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=DEFAULT_MAX_ENTRIES, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "text_hash TEXT NOT NULL, "
+            "source_language TEXT NOT NULL, "
+            "target_language TEXT NOT NULL, "
+            "options TEXT NOT NULL, "
+            "translation TEXT NOT NULL, "
+            "created_at REAL NOT NULL, "
+            "last_used_at REAL NOT NULL, "
+            "PRIMARY KEY (text_hash, source_language, target_language, options))"
+        )
+        self._connection.commit()
+        self.evict()
+
+    def get(self, text, source_language, target_language, options=None):
+        """Get a cached translation
+
+        Args:
+        text (str): Source text
+        source_language (str): Source language
+        target_language (str): Deepl target language
+        options (dict): Translation options passed to Deepl
+
+        Returns:
+        str: Cached translation or None
+        """
+        key = _key(text, source_language, target_language, options)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT translation FROM translations "
+                "WHERE text_hash = ? AND source_language = ? AND target_language = ? AND options = ?", key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                REGISTRY.inc("translation_cache_lookups_total", result="miss")
+                return None
+
+            self.hits += 1
+            REGISTRY.inc("translation_cache_lookups_total", result="hit")
+            self._connection.execute(
+                "UPDATE translations SET last_used_at = ? "
+                "WHERE text_hash = ? AND source_language = ? AND target_language = ? AND options = ?",
+                (time.time(),) + key
+            )
+            self._connection.commit()
+            return row[0]
+
+    def set(self, text, source_language, target_language, translation, options=None):
+        """Store a translation
+
+        Args:
+        text (str): Source text
+        source_language (str): Source language
+        target_language (str): Deepl target language
+        translation (str): Translated text
+        options (dict): Translation options passed to Deepl
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?, ?)",
+                _key(text, source_language, target_language, options) + (translation, now, now)
+            )
+            self._connection.commit()
+
+    def evict(self):
+        """Remove expired entries and the least recently used entries beyond max_entries
+
+        Returns:
+        int: Number of removed entries
+        """
+        with self._lock:
+            removed = self._connection.execute(
+                "DELETE FROM translations WHERE created_at < ?", (time.time() - self.max_age_days * 86400,)
+            ).rowcount
+            removed += self._connection.execute(
+                "DELETE FROM translations WHERE rowid NOT IN "
+                "(SELECT rowid FROM translations ORDER BY last_used_at DESC LIMIT ?)", (self.max_entries,)
+            ).rowcount
+            self._connection.commit()
+            return removed
+
+    def close(self):
+        """Close the cache database"""
+        with self._lock:
+            self._connection.close()
+
+
+def setup_translation_cache(cache_settings):
+    """Setup the translation cache from the optional [Cache] section of config.ini
+
+    Args:
+    cache_settings (CacheSettings): Cache settings
+
+    Returns:
+    TranslationCache: Translation cache or None if disabled
+    """
+    if not cache_settings.enabled:
+        return None
+
+    return TranslationCache(cache_settings.path, cache_settings.max_entries, cache_settings.max_age_days)
+
+
+def _key(text, source_language, target_language, options):
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    options = json.dumps(options or {}, sort_keys=True)
+    return text_hash, str(source_language).upper(), str(target_language).upper(), options
@@ -0,0 +1,328 @@
+import argparse
+import os
+
+from appstore import get_client, get_prerelease_versions, get_version_localizations, list_apps
+from fields import FIELDS
+from fleet import load_manifest, run_manifest, write_report
+from glossaries import setup_glossaries
+from locales import LocaleRegistry, configure_registry, get_registry, load_target_languages
+from metrics import write_metrics
+from pipeline import print_summary, update_localizations
+from profiles import run_profiles, setup_profile
+from settings import load_settings
+from translation import LazyTranslator
+from watch import watch_sources
+
+DEFAULT_FIELDS = "changelog,description"
+
+
+def main(field_names=None, description='Automatic translation and update of App Store localizations'):
+    """Translate and update localization fields, interactively or for all apps of a manifest
+
+    Args:
+    field_names (list): Names of the fields to update, selectable with --fields if None
+    description (str): Description of the command line interface
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('-c', '--config', type=str, help='Path to config.ini', required=False, default='config.ini')
+    if field_names is None:
+        parser.add_argument('-f', '--fields', type=str, required=False, default=DEFAULT_FIELDS,
+                            help=f"Comma separated fields to update: {', '.join(FIELDS)}")
+    parser.add_argument('-w', '--workers', type=int, help='Number of localizations translated and updated in parallel',
+                        required=False, default=1)
+    parser.add_argument('-m', '--manifest', type=str, help='Path to a JSON/YAML manifest of apps to update without '
+                                                           'user interaction', required=False)
+    parser.add_argument('-p', '--profile', type=str, help='Credentials of [AppStoreConnect:<profile>] to use instead '
+                                                          'of [AppStoreConnect], also for manifest entries without a '
+                                                          'profile', required=False)
+    parser.add_argument('-r', '--report', type=str, help='Path of the JSON report written in manifest mode',
+                        required=False, default='report.json')
+    parser.add_argument('--resume', action='store_true', help='Skip localizations already written by an interrupted '
+                                                              'run and reuse its translations')
+    parser.add_argument('--metrics-out', type=str, help='Path of a metrics file written after the run, Prometheus '
+                                                        'textfile format for .prom, JSON otherwise', required=False)
+    parser.add_argument('--watch', action='store_true', help='Keep running after the update and push every change of '
+                                                             'the source texts to the selected version')
+    parser.add_argument('--http2', action='store_true', help='Send AppStoreConnect requests over HTTP/2, multiplexing '
+                                                             'concurrent requests over few connections (requires httpx '
+                                                             'with h2)')
+    parser.add_argument('--refresh', action='store_true', help='Fetch apps, versions and localizations again instead '
+                                                               'of using the local metadata cache')
+    args = parser.parse_args()
+
+    # print all arguments
+    print('Given arguments:')
+    for arg in vars(args):
+        print(arg, getattr(args, arg))
+
+    if field_names is None:
+        field_names = [name.strip() for name in args.fields.split(',') if name.strip()]
+    unknown_fields = [name for name in field_names if name not in FIELDS]
+    if unknown_fields:
+        print(f"Unknown field(s): {', '.join(unknown_fields)}")
+        return
+    fields = [FIELDS[name] for name in field_names]
+
+    # load and validate config file once
+    settings = load_settings(args.config)
+    if not validate_config(settings, fields):
+        return
+
+    manifest = load_manifest(args.manifest) if args.manifest is not None else None
+    if manifest is None:
+        profile_names = {args.profile}
+    else:
+        profile_names = {entry.get("profile", args.profile) for entry in manifest}
+    unknown_profiles = [name for name in profile_names if name is not None and settings.profile(name) is None]
+    if unknown_profiles:
+        print(f"Unknown profile(s): {', '.join(unknown_profiles)}")
+        return
+
+    # setup APIs, the clients are created on first use
+    translator = setup_apis(settings)
+    configure_registry(LocaleRegistry(load_target_languages(translator)))
+    glossaries = setup_glossaries(translator, settings.glossary_directory)
+
+    # update the apps of several profiles with one worker process per profile, glossaries are synced once beforehand
+    if len(profile_names) > 1:
+        report = run_profiles(
+            args.config,
+            get_registry(),
+            manifest,
+            field_names,
+            default_profile=args.profile,
+            workers=args.workers,
+            resume=args.resume,
+            refresh=args.refresh,
+            http2=args.http2,
+            glossary_ids=glossaries.sync_all() if glossaries is not None else None
+        )
+        write_report(report, args.report)
+        print(f"Report written to {args.report}: {report['totals']}")
+        if args.metrics_out is not None:
+            write_metrics(args.metrics_out)
+        return
+
+    token_provider, cache, metadata_cache, journal = setup_profile(
+        settings, next(iter(profile_names), args.profile), args.workers, args.resume, args.refresh, args.http2
+    )
+
+    # update all apps of the manifest without user interaction
+    if manifest is not None:
+        report = run_manifest(
+            translator,
+            token_provider,
+            manifest,
+            fields,
+            settings.config,
+            workers=args.workers,
+            cache=cache,
+            journal=journal,
+            metadata_cache=metadata_cache
+        )
+        write_report(report, args.report)
+        print(f"Report written to {args.report}: {report['totals']}")
+        if args.metrics_out is not None:
+            write_metrics(args.metrics_out)
+        return
+
+    # let user select app and version
+    selected_app, selected_version = get_appid_version(token_provider, metadata_cache)
+    if selected_version is None:
+        return
+
+    # get all localizations for selected version
+    localizations = get_localization(token_provider, selected_version)
+    if localizations is None:
+        return
+
+    # get source texts and languages
+    sources = get_sources(settings.config, fields)
+    if sources is None:
+        return
+
+    # translate and update all fields, one Deepl request per target language and one PATCH per localization
+    summary = update_localizations(
+        translator,
+        token_provider,
+        sources,
+        localizations,
+        workers=args.workers,
+        cache=cache,
+        journal=journal,
+        app_id=selected_app["id"],
+        version_id=selected_version["id"]
+    )
+    print_summary(summary, ", ".join(field.title for field in fields), cache, get_client())
+    if args.metrics_out is not None:
+        write_metrics(args.metrics_out)
+
+    # push changed source texts with warm clients until interrupted
+    if args.watch:
+        watch_sources(
+            translator,
+            token_provider,
+            settings.config,
+            fields,
+            localizations,
+            workers=args.workers,
+            cache=cache,
+            journal=journal,
+            app_id=selected_app["id"],
+            version_id=selected_version["id"]
+        )
+
+
+def get_sources(config, fields):
+    """Get source texts and languages of the fields and let the user confirm them
+
+    Args:
+    config (configparser.ConfigParser): Parsed config.ini
+    fields (list): Fields to update
+
+    Returns:
+    dict: Source text and language by localization attribute, or None if the user cancelled
+    """
+    sources = {}
+    for field in fields:
+        language = field.source_language(config)
+        with open(field.source_path(config), 'r') as f:
+            text = f.read()
+
+        # print text and language
+        print(f"=== {field.title} ===")
+        print(f"{field.title} source language: {language}")
+        print(text)
+        sources[field.attribute] = (text, language)
+
+    # ask user to continue
+    if input("Continue? (y/n): ") != "y":
+        return None
+
+    return sources
+
+
+def get_localization(token, version):
+    """Get localization from user
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    version (dict): AppStoreConnect version
+
+    Returns:
+    dict: AppStoreConnect localization
+    """
+    print("=== App Store Version Localizations ===")
+    localizations = get_version_localizations(token, version)
+    print("Following localizations will be updated:")
+    for localization in localizations:
+        print(f"{localization['locale']} ", end=" ")
+
+    # ask user to continue
+    if input("Continue? (y/n): ") != "y":
+        return None
+
+    return localizations
+
+
+def get_appid_version(token, metadata_cache=None):
+    """Get app and version from user
+
+    Args:
+    token (str or TokenProvider): AppStoreConnect API token
+    metadata_cache (MetadataCache): Optional metadata cache
+
+    Returns:
+    dict, dict: Selected app and version
+    """
+    print("=== Apps ===")
+    apps = list_apps(token, metadata_cache)
+
+    if len(apps) == 0:
+        print("No apps found")
+        return None, None
+
+    for i, app in enumerate(apps):
+        print(f"{i}: {app['name']}")
+    selected_app = apps[int(input("Select app: "))]
+    print(f"Selected app: {selected_app['name']}")
+
+    print("=== Versions ===")
+    versions = get_prerelease_versions(token, selected_app["id"], metadata_cache)
+
+    if len(versions) == 0:
+        print("No prerelease versions found")
+        return None, None
+
+    for i, version in enumerate(versions):
+        print(f"{i}: {version['versionString']} - {version['platform']}")
+    selected_version = versions[int(input("Select version: "))]
+    print(f"Selected version: {selected_version['versionString']} - {selected_version['platform']}")
+
+    return selected_app, selected_version
+
+
+def setup_apis(settings):
+    """Setup APIs
+
+    Args:
+    settings (Settings): Settings
+
+    Returns:
+    LazyTranslator: Deepl API, created on first use
+    """
+    return LazyTranslator(settings.deepl_auth_key)
+
+
+def validate_config(settings, fields):
+    """Validate config file
+
+    Args:
+    settings (Settings): Settings loaded from the config file
+    fields (list): Fields to update
+    """
+
+    # check if config file exists
+    if not os.path.isfile(settings.path):
+        print('Config file does not exist')
+        return False
+
+    # check if config file is readable
+    if not os.access(settings.path, os.R_OK):
+        print('Config file is not readable')
+        return False
+
+    # check if config.ini contains all required sections
+    required_sections = ['Deepl', 'AppStoreConnect'] + [field.section for field in fields]
+    config = settings.config
+    for section in required_sections:
+        if section not in config:
+            print('Config file does not contain section ' + section)
+            return False
+
+    # check if config.ini contains all required keys
+    required_keys = {
+        'Deepl': ['auth_key'],
+        'AppStoreConnect': ['key_id', 'key_file_path', 'issuer_id']
+    }
+    for profile in settings.profiles.values():
+        required_keys[profile.section] = ['key_id', 'key_file_path', 'issuer_id']
+    for field in fields:
+        required_keys[field.section] = [field.path_key, field.language_key]
+    for section in required_keys:
+        for key in required_keys[section]:
+            if key not in config[section]:
+                print('Config file does not contain key ' + key + ' in section ' + section)
+                return False
+
+    # check if source texts exist
+    for field in fields:
+        if not os.path.isfile(field.source_path(config)):
+            print(f'{field.title} file does not exist')
+            return False
+
+    return True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+from appstore import update_localization
+from pipeline import print_summary, update_localizations
+
+DEFAULT_DEBOUNCE = 0.3
+DEFAULT_POLL_INTERVAL = 0.5
+
+# inotify(7) flags, editors often save by writing a new file and renaming it over the old one
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class FileWatcher:
+    """Waits for changes of files, using inotify on Linux and polling their modification times elsewhere
+
+    The directories of the files are watched, so files replaced by a rename are noticed as well.
+    """
+
+    def __init__(self, paths, debounce=DEFAULT_DEBOUNCE, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.paths = {os.path.abspath(path) for path in paths}
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._fd = None
+        self._directories = {}
+        self._snapshot = self._stat()
+        self._setup_inotify()
+
+    def wait(self, timeout=None):
+        """Wait until files changed and no further change followed within `debounce` seconds
+
+        Args:
+        timeout (float): Maximum number of seconds to wait for the first change, forever if None
+
+        Returns:
+        set: Absolute paths of the changed files, empty on timeout
+        """
+        changed = self._wait_changes(timeout)
+        if not changed:
+            return changed
+
+        while True:
+            more = self._wait_changes(self.debounce)
+            if not more:
+                return changed
+            changed |= more
+
+    def close(self):
+        """Stop watching"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _setup_inotify(self):
+        library = ctypes.util.find_library("c")
+        if library is None:
+            return
+        libc = ctypes.CDLL(library, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            return
+
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return
+        for directory in {os.path.dirname(path) for path in self.paths}:
+            wd = libc.inotify_add_watch(fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+            if wd < 0:
+                os.close(fd)
+                self._directories = {}
+                return
+            self._directories[wd] = directory
+        self._fd = fd
+
+    def _wait_changes(self, timeout):
+        if self._fd is None:
+            return self._poll_changes(timeout)
+
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        data = os.read(self._fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            path = os.path.join(self._directories.get(wd, ""), os.fsdecode(name))
+            if path in self.paths:
+                changed.add(path)
+        return changed
+
+    def _poll_changes(self, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._stat()
+            changed = {path for path in self.paths if snapshot[path] != self._snapshot[path]}
+            self._snapshot = snapshot
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.poll_interval if deadline is None else
+                       max(0.0, min(self.poll_interval, deadline - time.monotonic())))
+
+    def _stat(self):
+        snapshot = {}
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                snapshot[path] = None
+        return snapshot
+
+
+def watch_sources(translator, token, config, fields, localizations, workers=1, cache=None, journal=None, app_id=None,
+                  version_id=None, debounce=DEFAULT_DEBOUNCE):
+    """Push changed source texts to already resolved localizations until interrupted
+
+    Translator, token and connection pool stay warm between pushes, and only the fields whose text actually changed
+    are translated and updated. The fetched texts of the watched fields are outdated once a push ran, so they are
+    dropped from copies of the localizations and replaced by the texts written by every push; a change back to an
+    earlier text is then compared with the text written last.
+
+    Args:
+    translator (deepl.Translator): Deepl translator
+    token (str or TokenProvider): AppStoreConnect API token
+    config (configparser.ConfigParser): Parsed config.ini with the source texts
+    fields (list): Fields to watch
+    localizations (list): AppStoreConnect localizations to update
+    workers (int): Number of parallel workers
+    cache (TranslationCache): Optional translation cache
+    journal (Journal): Optional resume journal
+    app_id (str): App ID
+    version_id (str): AppStoreConnect version id
+    debounce (float): Seconds without further changes before a change is pushed
+    """
+    watched_attributes = {field.attribute for field in fields}
+    localizations = [{key: value for key, value in localization.items() if key not in watched_attributes}
+                     for localization in localizations]
+    localizations_by_id = {localization['id']: localization for localization in localizations}
+
+    def update_and_remember(token, localization_id, attributes):
+        status_code = update_localization(token, localization_id, attributes)
+        if status_code == 200:
+            localizations_by_id[localization_id].update(attributes)
+        return status_code
+
+    texts = {field.attribute: read_text(field.source_path(config)) for field in fields}
+    watcher = FileWatcher([field.source_path(config) for field in fields], debounce)
+    print(f"Watching {', '.join(field.source_path(config) for field in fields)} for changes, press Ctrl+C to stop")
+    try:
+        while True:
+            changed_paths = watcher.wait()
+            sources = {}
+            for field in fields:
+                if os.path.abspath(field.source_path(config)) not in changed_paths:
+                    continue
+                text = read_text(field.source_path(config))
+                if text is not None and text != texts[field.attribute]:
+                    sources[field.attribute] = (text, field.source_language(config))
+            if not sources:
+                continue
+
+            start = time.perf_counter()
+            summary = update_localizations(translator, token, sources, localizations, workers=workers, cache=cache,
+                                           journal=journal, app_id=app_id, version_id=version_id,
+                                           update_function=update_and_remember)
+            changed_fields = [field for field in fields if field.attribute in sources]
+            print_summary(summary, ", ".join(field.title for field in changed_fields), cache)
+            print(f"Pushed in {time.perf_counter() - start:.1f} s")
+            for attribute, (text, _) in sources.items():
+                texts[attribute] = text
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    finally:
+        watcher.close()
+
+
+def read_text(path):
+    """Read a source text
+
+    Args:
+    path (str): Path of the source text
+
+    Returns:
+    str: Text or None if the file is missing, e.g. while an editor replaces it
+    """
+    try:
+        with open(path, 'r') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None